@@ -1 +1,61 @@
-# Agents package initialization
\ No newline at end of file
+# Agents package initialization
+import asyncio
+import logging
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+# Serializes launches so a missing chromium is only installed once
+_browser_launch_lock = asyncio.Lock()
+
+
+async def launch_chromium(playwright, **launch_options):
+    """Launch chromium, installing it first if the launch fails"""
+    async with _browser_launch_lock:
+        try:
+            browser = await playwright.chromium.launch(**launch_options)
+        except Exception as e:
+            logger.warning(f"Browser launch failed: {e}")
+            await _install_chromium()
+            browser = await playwright.chromium.launch(**launch_options)
+
+        logger.info("✅ Chromium browser is available")
+        return browser
+
+
+async def _run(*args: str, timeout: int) -> Tuple[int, str]:
+    """Run a command without blocking the event loop, returning (returncode, stderr)"""
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode, stderr.decode(errors="replace")
+
+
+async def _install_chromium():
+    """Fallback for images without a bundled browser (the Dockerfile installs it)"""
+    logger.warning("❌ Chromium not found, attempting installation...")
+    try:
+        logger.info("Installing chromium browser...")
+        returncode, stderr = await _run("playwright", "install", "chromium", timeout=120)
+
+        if returncode != 0:
+            logger.error(f"Playwright install failed: {stderr}")
+            # Try with deps
+            logger.info("Trying with system dependencies...")
+            await _run("playwright", "install-deps", "chromium", timeout=180)
+            await _run("playwright", "install", "chromium", timeout=120)
+
+        logger.info("✅ Browser installation completed")
+
+    except Exception as install_error:
+        logger.error(f"❌ Failed to install browser: {install_error}")
+        logger.error("Browser Use may not work properly")
+        # Don't raise - let the app continue and fail gracefully
@@ -0,0 +1,251 @@
+"""
+Response cache for Browser Use food searches
+
+A search drives Chromium plus a multi-step LLM agent run, so identical
+requests are served from a cache keyed on a canonical hash of the
+SearchRequest and the agent config that answered it. An optional semantic layer reuses a cached response when the
+search query of a request is worded differently but means the same thing;
+the location (normalized) and every other field must still match exactly.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Protocol, Set, Tuple
+
+import httpx
+import openai
+
+from app.models import AgentConfig, SearchRequest, SearchResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL", "3600"))
+SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.92"))
+EMBEDDING_MODEL = os.getenv("LLM_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+
+
+class CacheBackend(Protocol):
+    """Storage interface for serialized search responses"""
+
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+
+class InMemoryBackend:
+    """Process-local backend with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._store: Dict[str, Tuple[float, str]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._store.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        if key not in self._store and len(self._store) >= self.max_entries:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            self._store.pop(next(iter(self._store)))
+        self._store[key] = (time.monotonic() + ttl, value)
+
+
+class RedisBackend:
+    """Redis backend so cached responses are shared across processes"""
+
+    def __init__(self, url: str, prefix: str = "rappi:search:"):
+        # Optional dependency - only needed when REDIS_URL is configured
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._redis.get(self.prefix + key)
+        return value.decode() if value is not None else None
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._redis.set(self.prefix + key, value, ex=ttl)
+
+
+class LLMCache:
+    """Exact + semantic cache for SearchResponse objects"""
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        ttl: int = DEFAULT_TTL_SECONDS,
+        semantic: bool = True,
+        threshold: float = SEMANTIC_THRESHOLD,
+        max_entries: int = 1024
+    ):
+        self.backend = backend or InMemoryBackend()
+        self.ttl = ttl
+        self.semantic = semantic
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+
+        # Semantic index: (expires_at, structured fingerprint, embedding, cache key).
+        # Kept in-process; the embeddings are cheap to rebuild after a restart.
+        self._vectors: List[Tuple[float, str, List[float], str]] = []
+        # Embedding requests still running, so their tasks aren't garbage collected
+        self._pending: Set[asyncio.Task] = set()
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+    def set_http_client(self, http_client: httpx.AsyncClient):
+        """Send embedding requests through a shared HTTP client"""
+        # The OpenAI client itself is created on the first embedding, since it
+        # raises without an API key and the semantic layer may never be used
+        self._http_client = http_client
+        self._client = None
+
+    @staticmethod
+    def _canonical(search_request: SearchRequest, config: AgentConfig, **dump_options) -> Dict[str, Any]:
+        """Request fields with the location normalized, plus the agent config"""
+        data = search_request.model_dump(mode="json", **dump_options)
+        data["location"] = " ".join(search_request.location.lower().split())
+        # Agents share this cache, so an answer from another model or setup
+        # must not be reused; pool size doesn't change answers
+        data["agent_config"] = config.model_dump(mode="json", exclude={"pool_size"})
+        return data
+
+    @classmethod
+    def cache_key(cls, search_request: SearchRequest, config: AgentConfig) -> str:
+        """Canonical hash of the full request and agent config"""
+        payload = json.dumps(cls._canonical(search_request, config), sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @classmethod
+    def _fingerprint(cls, search_request: SearchRequest, config: AgentConfig) -> str:
+        """Hash of the fields a semantic hit must match exactly - all but the query"""
+        # Location is matched exactly: similar-sounding neighbourhoods have
+        # different restaurants, and embeddings can't tell them apart
+        payload = json.dumps(cls._canonical(search_request, config, exclude={"search_query"}), sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, search_request: SearchRequest, config: AgentConfig) -> Optional[SearchResponse]:
+        """Return a cached response for the request under this agent config, if any"""
+        key = self.cache_key(search_request, config)
+        cached = await self._backend_get(key)
+
+        if cached is None and self.semantic and search_request.search_query:
+            similar_key = await self._semantic_lookup(search_request, config)
+            if similar_key:
+                cached = await self._backend_get(similar_key)
+
+        if cached is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return SearchResponse.model_validate_json(cached)
+
+    async def set(self, search_request: SearchRequest, config: AgentConfig, response: SearchResponse) -> None:
+        """Store a response for the request under this agent config"""
+        key = self.cache_key(search_request, config)
+        try:
+            await self.backend.set(key, response.model_dump_json(), self.ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed: {e}")
+            return
+
+        if self.semantic and search_request.search_query:
+            # The embedding round trip stays off the search's critical path
+            task = asyncio.create_task(
+                self._index(search_request, self._fingerprint(search_request, config), key)
+            )
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _index(self, search_request: SearchRequest, fingerprint: str, key: str) -> None:
+        """Add a stored request to the semantic index"""
+        vector = await self._embed(search_request)
+        if vector is None:
+            return
+        
+        # A refreshed request replaces its old entry rather than adding another
+        self._vectors = [entry for entry in self._vectors if entry[3] != key]
+        expires_at = time.monotonic() + self.ttl
+        self._vectors.append((expires_at, fingerprint, vector, key))
+        if len(self._vectors) > self.max_entries:
+            # Oldest first, like the exact store
+            del self._vectors[:-self.max_entries]
+
+    async def _backend_get(self, key: str) -> Optional[str]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            # A broken cache must never fail a search
+            logger.warning(f"Cache read failed: {e}")
+            return None
+
+    async def _semantic_lookup(self, search_request: SearchRequest, config: AgentConfig) -> Optional[str]:
+        """Find the cache key of the most similar stored request above the threshold"""
+        now = time.monotonic()
+        self._vectors = [entry for entry in self._vectors if entry[0] >= now]
+
+        fingerprint = self._fingerprint(search_request, config)
+        candidates = [entry for entry in self._vectors if entry[1] == fingerprint]
+        if not candidates:
+            return None
+
+        vector = await self._embed(search_request)
+        if vector is None:
+            return None
+
+        best_key, best_score = None, self.threshold
+        for _, _, stored, key in candidates:
+            score = _cosine_similarity(vector, stored)
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key:
+            logger.info(f"Semantic cache match (similarity {best_score:.3f})")
+        return best_key
+
+    async def _embed(self, search_request: SearchRequest) -> Optional[List[float]]:
+        text = search_request.search_query
+        try:
+            if self._client is None:
+                self._client = openai.AsyncOpenAI(http_client=self._http_client)
+            result = await self._client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+            return result.data[0].embedding
+        except Exception as e:
+            logger.warning(f"Embedding request failed, skipping semantic cache: {e}")
+            return None
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+# Global cache instance shared by every RappiAgent
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the global search cache instance"""
+    global _llm_cache
+    if _llm_cache is None:
+        redis_url = os.getenv("REDIS_URL")
+        backend = RedisBackend(redis_url) if redis_url else InMemoryBackend()
+        semantic = os.getenv("LLM_CACHE_SEMANTIC", "true").lower() == "true"
+        _llm_cache = LLMCache(backend=backend, semantic=semantic)
+    return _llm_cache
@@ -0,0 +1,225 @@
+"""
+Parsing of raw Browser Use agent output into restaurant results
+
+Runs in spawned parse worker processes, so this module imports only what the
+parsing needs - not the browser, LLM and HTTP stack of the agent module.
+"""
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterator, List, Optional, Tuple
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+
+from app.models import RestaurantResult
+
+logger = logging.getLogger(__name__)
+
+# Built once - constructing a TypeAdapter compiles a validator
+_RESTAURANT_LIST_ADAPTER = TypeAdapter(List[RestaurantResult])
+
+# Common patterns in Rappi listings, used when the agent returns free text
+_RESTAURANT_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'restaurante?\s*:?\s*([^,\n]+)',
+        r'([^,\n]+)\s*-\s*\d+\s*min',
+        r'([A-Z][^,\n]{5,50})\s*\$\s*\d+'
+    )
+]
+
+
+def _iter_json_spans(content: str, offset: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) of each top-level balanced {...} object or [...] array in one pass.
+    
+    Bracket counting skips string literals and escapes; a record left open at
+    the end (truncated output) is never yielded. A stray "[" in surrounding
+    prose that is never closed doesn't hide the records after it.
+    """
+    closers: List[str] = []
+    start = 0
+    in_string = False
+    escaped = False
+    
+    for index in range(offset, len(content)):
+        char = content[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '{' or char == '[':
+            if not closers:
+                start = index
+            closers.append('}' if char == '{' else ']')
+        elif closers:
+            if char == '"':
+                in_string = True
+            elif char == '}' or char == ']':
+                if char != closers.pop():
+                    # Mismatched brackets - not JSON, drop this span
+                    closers.clear()
+                elif not closers:
+                    yield start, index + 1
+    
+    # An unclosed top-level "[" was most likely prose; rescan just past it
+    if closers and content[start] == '[':
+        yield from _iter_json_spans(content, start + 1)
+
+
+def _convert_parsed_data_to_results(data: Any) -> List[RestaurantResult]:
+    """Convert parsed JSON data to RestaurantResult objects"""
+    results = []
+    
+    # Handle different possible JSON structures
+    restaurants_data = []
+    if 'restaurants' in data:
+        restaurants_data = data['restaurants']
+    elif 'results' in data:
+        restaurants_data = data['results']
+    elif isinstance(data, list):
+        restaurants_data = data
+    else:
+        # Single restaurant object
+        restaurants_data = [data]
+    
+    # Normalize the agent's field names into plain dicts first
+    restaurant_dicts = []
+    for restaurant_data in restaurants_data:
+        try:
+            menu_items = [
+                {
+                    "name": item_data.get('name', ''),
+                    "price": item_data.get('price'),
+                    "description": item_data.get('description', ''),
+                    "image_url": item_data.get('image_url', ''),
+                    "available": item_data.get('available', True)
+                } for item_data in restaurant_data.get('menu_items', [])
+            ]
+            
+            restaurant_dicts.append({
+                "restaurant_name": restaurant_data.get('name', restaurant_data.get('restaurant_name', 'Unknown')),
+                "cuisine_type": restaurant_data.get('cuisine_type', restaurant_data.get('cuisine', '')),
+                "estimated_price": restaurant_data.get('estimated_price', restaurant_data.get('price')),
+                "delivery_time": restaurant_data.get('delivery_time', ''),
+                "delivery_fee": restaurant_data.get('delivery_fee'),
+                "rating": restaurant_data.get('rating'),
+                "url": restaurant_data.get('url', restaurant_data.get('link', '')),
+                "image_url": restaurant_data.get('image_url', restaurant_data.get('image', '')),
+                "address": restaurant_data.get('address', restaurant_data.get('location', '')),
+                "menu_items": menu_items,
+                "is_open": restaurant_data.get('is_open', restaurant_data.get('open', True)),
+                "promotions": restaurant_data.get('promotions', restaurant_data.get('offers', []))
+            })
+            
+        except Exception as e:
+            logger.warning(f"Error parsing restaurant data: {str(e)}")
+            continue
+    
+    # Validate the whole batch in one pass
+    try:
+        return _RESTAURANT_LIST_ADAPTER.validate_python(restaurant_dicts)
+    except ValidationError:
+        pass
+    
+    # Some entry is invalid - fall back to per-item validation and skip the bad ones
+    for restaurant_dict in restaurant_dicts:
+        try:
+            results.append(RestaurantResult.model_validate(restaurant_dict))
+        except ValidationError as e:
+            logger.warning(f"Error parsing restaurant data: {str(e)}")
+    
+    return results
+
+
+def _extract_data_manually(content: str) -> List[RestaurantResult]:
+    """Extract restaurant data manually from text content"""
+    results = []
+    
+    # This is a simplified manual extraction
+    # In a real implementation, you'd use more sophisticated text parsing
+    
+    found_restaurants = set()
+    for pattern in _RESTAURANT_PATTERNS:
+        matches = pattern.findall(content)
+        for match in matches:
+            if isinstance(match, tuple):
+                match = match[0]
+            cleaned_name = match.strip()
+            if len(cleaned_name) > 3 and cleaned_name not in found_restaurants:
+                found_restaurants.add(cleaned_name)
+    
+    # Create basic restaurant objects
+    for name in list(found_restaurants)[:5]:  # Limit to 5 for manual extraction
+        restaurant = RestaurantResult.model_construct(
+            restaurant_name=name,
+            cuisine_type="",
+            estimated_price=None,
+            delivery_time="30-45 min",
+            url="https://rappi.com.ar",
+            menu_items=[]
+        )
+        results.append(restaurant)
+    
+    return results
+
+
+def parse_agent_output(content: str, max_results: int) -> List[RestaurantResult]:
+    """Turn raw agent output into restaurant results (runs in the parse process pool)"""
+    results = []
+    
+    # Try to parse JSON if the content looks like JSON
+    if isinstance(content, str):
+        # Agents may emit several JSON records; use the first that yields results
+        for start, end in _iter_json_spans(content):
+            try:
+                parsed_data = orjson.loads(content[start:end])
+            except orjson.JSONDecodeError:
+                continue
+            results = _convert_parsed_data_to_results(parsed_data)
+            if results:
+                break
+    
+    # If we couldn't parse JSON, try to extract data manually
+    if not results:
+        results = _extract_data_manually(content)
+    
+    # Limit results to max_results
+    return results[:max_results]
+
+
+# Parse worker processes, shared by every agent and started on first use
+_PARSE_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _init_parse_worker():
+    """Give each parse process its own stderr logging"""
+    logging.basicConfig(level=logging.INFO)
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Get the process pool used for agent result parsing"""
+    global _PARSE_POOL
+    if _PARSE_POOL is None:
+        # Spawned, not forked: by now the app runs threads (the log listener
+        # among them), and a forked child would inherit its QueueHandler and
+        # log into a queue nothing drains
+        _PARSE_POOL = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_parse_worker
+        )
+    return _PARSE_POOL
+
+
+def reset_parse_pool():
+    """Drop a broken parse pool so the next search starts a fresh one"""
+    global _PARSE_POOL
+    if _PARSE_POOL is not None:
+        _PARSE_POOL.shutdown(wait=False)
+        _PARSE_POOL = None
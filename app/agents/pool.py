@@ -0,0 +1,82 @@
+"""
+Pool of RappiAgents so searches run in parallel instead of sharing one agent
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from app.models import AgentConfig
+from app.agents.rappi_agent import RappiAgent
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPool:
+    """Fixed set of identically configured agents, each running one search at a time"""
+
+    def __init__(self, size: Optional[int] = None, config: Optional[AgentConfig] = None):
+        self.config = config or AgentConfig()
+        self.size = size or self.config.pool_size
+        self.agents: List[RappiAgent] = []
+        # Agent that most recently finished a search, for status reporting
+        self.last_used: Optional[RappiAgent] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._closed = False
+        # Searches holding or waiting for an agent; aclose lets them finish
+        self._in_use = 0
+        self._drained = asyncio.Event()
+
+    def _fill(self):
+        """Create the agents on first use"""
+        # Build them all before publishing any, so a failure leaves the pool empty
+        agents = [RappiAgent(self.config) for _ in range(self.size)]
+        self._idle = asyncio.Queue()
+        for agent in agents:
+            self._idle.put_nowait(agent)
+        self.agents = agents
+        logger.info(f"Agent pool ready with {self.size} agents")
+
+    async def acquire(self) -> RappiAgent:
+        """Wait for an idle agent"""
+        if self._closed:
+            raise RuntimeError("Agent pool is closed")
+        if self._idle is None:
+            self._fill()
+        
+        self._in_use += 1
+        try:
+            return await self._idle.get()
+        except BaseException:
+            self._done()
+            raise
+
+    def release(self, agent: RappiAgent):
+        """Return an agent to the pool"""
+        self.last_used = agent
+        self._idle.put_nowait(agent)
+        self._done()
+
+    def _done(self):
+        self._in_use -= 1
+        if self._in_use == 0:
+            self._drained.set()
+
+    @asynccontextmanager
+    async def agent(self) -> AsyncIterator[RappiAgent]:
+        """Check an agent out for the duration of the block"""
+        agent = await self.acquire()
+        try:
+            yield agent
+        finally:
+            self.release(agent)
+
+    async def aclose(self):
+        """Stop handing out agents, then close their sessions once searches finish"""
+        self._closed = True
+        if self._in_use:
+            self._drained.clear()
+            await self._drained.wait()
+        
+        for agent in self.agents:
+            await agent.aclose()
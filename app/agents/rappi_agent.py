@@ -12,11 +12,12 @@ Rappi.com.ar usage notes for automation:
 
 import asyncio
 import os
-import json
 import logging
-from typing import List, Dict, Any, Optional
+from contextlib import asynccontextmanager
+from concurrent.futures.process import BrokenProcessPool
+from operator import methodcaller
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional
 from datetime import datetime
-import re
 
 from browser_use import Agent, BrowserSession
 from browser_use.llm import ChatOpenAI
@@ -31,18 +32,103 @@ from app.models import (
     SearchMetadata,
     AgentConfig
 )
+from app.agents.cache import get_llm_cache
+from app.agents.parsing import get_parse_pool, parse_agent_output, reset_parse_pool
+from app.browser_pool import (
+    BROWSER_ARGS,
+    HEADLESS,
+    USER_AGENT,
+    VIEWPORT,
+    block_resources,
+    get_browser_pool
+)
 
 logger = logging.getLogger(__name__)
 
+# How to pull the output out of each agent result type, resolved on first use
+_EXTRACTORS: Dict[type, Callable[[Any], Any]] = {}
+
+
+def _extract_content(agent_result) -> Any:
+    """Get the agent's final output, preferring final_result over extracted_content"""
+    result_type = type(agent_result)
+    extractor = _EXTRACTORS.get(result_type)
+    if extractor is None:
+        if hasattr(result_type, 'final_result'):
+            extractor = methodcaller('final_result')
+        elif hasattr(result_type, 'extracted_content'):
+            extractor = methodcaller('extracted_content')
+        else:
+            extractor = str
+        _EXTRACTORS[result_type] = extractor
+    return extractor(agent_result)
+
+
+# Task instructions shared by every search. OpenAI prompt caching matches on
+# exact prefixes, so this block leads the task and per-request values follow.
+_STATIC_TASK_PREFIX = """Go to rappi.com.ar and immediately start searching for food delivery options. \
+PRIORITY: Focus on searching for restaurants and food options first. \
+The main goal is to find and extract restaurant information, not to set up location. \
+LOCATION HANDLING: If needed, the location can be set to the delivery location given under SEARCH PARAMETERS \
+using the element with selector 'div[data-qa="address-container"]' at the top left. \
+However, DO NOT spend time trying to set location if it's not immediately obvious or if it causes delays. \
+You can proceed with the default location if restaurants are already showing. \
+IMPORTANT: Do not get stuck on address entry - if location setting is not working immediately, \
+skip it and focus on searching for food options.
+
+SEARCH STRATEGY:
+- Start browsing restaurants immediately without waiting for location confirmation
+- Use the main search functionality to find restaurants
+- If you see restaurants loading, proceed with data extraction
+- Only attempt location setting if absolutely necessary and only for 1-2 attempts max
+- Never spend more than 30 seconds on location/address entry
+- Apply every filter and preference listed under SEARCH PARAMETERS
+
+Extract information for the number of restaurants given under SEARCH PARAMETERS, including:
+1. Restaurant name
+2. Cuisine type
+3. Estimated delivery time
+4. Restaurant rating
+5. Delivery fee (if shown)
+6. Direct URL/link to the restaurant page
+7. Restaurant image URL (if available)
+8. Address or location info
+9. At least 2-3 popular menu items with names and prices
+10. Any current promotions or discounts
+11. Whether the restaurant is currently open
+
+For each menu item, capture:
+- Item name
+- Price in Argentine Pesos (ARS)
+- Brief description if available
+
+Return the results in a structured JSON format that can be easily parsed.
+Focus on accuracy and include real prices and delivery information.
+Work with whatever restaurants are available - don't get stuck on location verification."""
+
 
 class RappiAgent:
     """Browser Use agent for automated food search on Rappi Argentina"""
     
-    def __init__(self, config: Optional[AgentConfig] = None):
+    # Jobs served by one pooled browser session before it is relaunched, which
+    # isolates cookies between searches and caps per-context memory growth
+    SESSION_MAX_USES = int(os.getenv("BROWSER_SESSION_MAX_USES", "10"))
+    
+    def __init__(self, config: Optional[AgentConfig] = None, session_pool_size: int = 1):
         """Initialize the Rappi search agent"""
         self.config = config or AgentConfig()
+        # Own browser sessions, used only while the shared context pool is down;
+        # one per search this agent runs at a time
+        self.session_pool_size = session_pool_size
         self.session_id = None
         self.last_search_time = None
+        # Only deterministic runs may be answered from the response cache
+        self.cache = get_llm_cache() if self.config.llm_temperature == 0 else None
+        
+        # Warm browser sessions checked out per search (None = launch on demand)
+        self.pool: Optional[asyncio.Queue] = None
+        self._session_uses: Dict[int, int] = {}
+        self._closed = False
         
         # Set up LLM
         api_key = os.getenv("OPENAI_API_KEY")
@@ -52,12 +138,9 @@ class RappiAgent:
         self.llm = ChatOpenAI(
             model=self.config.llm_model,
             api_key=api_key,
-            temperature=0.1
+            temperature=self.config.llm_temperature
         )
         
-        # Set up browser session for production deployment
-        headless_mode = os.getenv("HEADLESS", "true").lower() == "true"
-        
         # Additional Browser Use specific environment variables
         os.environ["BROWSER_USE_HEADLESS"] = "true"
         
@@ -66,186 +149,216 @@ class RappiAgent:
         if browsers_path and browsers_path != "":
             os.environ["PLAYWRIGHT_BROWSERS_PATH"] = browsers_path
         
-        # Force browser installation if not found (Nixpacks fallback)
-        self._ensure_browser_available()
-        
-        # Browser arguments for containerized/production environment
-        browser_args = [
-            "--no-sandbox",
-            "--disable-setuid-sandbox",
-            "--disable-dev-shm-usage",
-            "--disable-gpu",
-            "--disable-background-timer-throttling",
-            "--disable-backgrounding-occluded-windows", 
-            "--disable-renderer-backgrounding",
-            "--disable-features=TranslateUI,VizDisplayCompositor",
-            "--disable-ipc-flooding-protection",
-            "--enable-features=NetworkService",
-            "--force-color-profile=srgb",
-            "--disable-blink-features=AutomationControlled",
-            "--disable-extensions-except=/tmp/ublock,/tmp/clearurls,/tmp/cookies",
-            "--disable-component-extensions-with-background-pages",
-            "--disable-default-apps",
-            "--mute-audio",
-            "--no-first-run",
-            "--no-default-browser-check"
-        ]
-        
-        # For very low memory environments, add single-process mode
-        if os.getenv("DISABLE_DEV_SHM_USAGE", "false").lower() == "true":
-            browser_args.extend([
-                "--memory-pressure-off",
-                "--max_old_space_size=4096"
-            ])
-        
+        # Same launch settings as the shared browser, for fallback sessions
         self.browser_profile = BrowserProfile(
-            headless=headless_mode,
-            viewport_size={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36",
-            browser_args=browser_args
+            headless=HEADLESS,
+            keep_alive=True,  # Pooled sessions outlive each Agent run
+            viewport_size=VIEWPORT,
+            user_agent=USER_AGENT,
+            browser_args=list(BROWSER_ARGS)
         )
         
         logger.info(f"RappiAgent initialized with model: {self.config.llm_model}")
-        logger.info(f"Browser headless mode: {headless_mode}")
-        logger.info(f"Browser args: {browser_args}")
+        logger.info(f"Browser headless mode: {HEADLESS}")
+        logger.info(f"Browser args: {list(BROWSER_ARGS)}")
         logger.info(f"Playwright browsers path: {os.getenv('PLAYWRIGHT_BROWSERS_PATH', 'default')}")
 
-    def _ensure_browser_available(self):
-        """Ensure chromium browser is available, install if needed"""
+    async def start_pool(self, size: int):
+        """Launch `size` browser sessions up front so searches skip the cold start"""
+        if self.pool is not None:
+            return
+        
+        self.pool = asyncio.Queue()
+        for _ in range(size):
+            try:
+                self.pool.put_nowait(await self._launch_session())
+            except Exception as e:
+                # Leave an empty slot - it is launched on first checkout instead
+                logger.warning(f"Could not pre-launch browser session: {e}")
+                self.pool.put_nowait(None)
+        
+        logger.info(f"Browser session pool ready with {size} slots")
+
+    async def _launch_session(self) -> BrowserSession:
+        """Start a new browser session"""
+        browser_session = BrowserSession(browser_profile=self.browser_profile)
+        await browser_session.start()
+        
+        if browser_session.browser_context:
+            await block_resources(browser_session.browser_context)
+        
+        self._session_uses[id(browser_session)] = 0
+        return browser_session
+
+    async def _acquire_session(self) -> BrowserSession:
+        """Check a browser session out of the pool"""
+        # A closed agent must not launch sessions that nothing will close
+        if self._closed:
+            raise RuntimeError("Agent is closed")
+        if self.pool is None:
+            await self.start_pool(self.session_pool_size)
+        
+        browser_session = await self.pool.get()
+        if browser_session is None:
+            try:
+                browser_session = await self._launch_session()
+            except Exception:
+                self.pool.put_nowait(None)
+                raise
+        return browser_session
+
+    async def _release_session(self, browser_session: BrowserSession, healthy: bool = True):
+        """Return a session to the pool, relaunching it if it is worn out or broken"""
+        uses = self._session_uses.pop(id(browser_session), 0) + 1
+        
+        if self.pool is None:
+            # The agent was closed while this session was checked out
+            await self._close_session(browser_session)
+            return
+        
+        if healthy and uses < self.SESSION_MAX_USES:
+            self._session_uses[id(browser_session)] = uses
+            self.pool.put_nowait(browser_session)
+            return
+        
+        await self._close_session(browser_session)
+        self.pool.put_nowait(None)
+
+    async def _close_session(self, browser_session: BrowserSession):
         try:
-            # Quick test to see if chromium is available
-            import subprocess
-            result = subprocess.run(
-                ["python", "-c", "from playwright.sync_api import sync_playwright; p = sync_playwright(); p.start(); p.chromium.launch(headless=True).close()"],
-                capture_output=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                logger.info("✅ Chromium browser is available")
-                return
+            await browser_session.kill()
         except Exception as e:
-            logger.warning(f"Browser test failed: {e}")
+            logger.warning(f"Error closing browser session: {e}")
+
+    async def aclose(self):
+        """Close every pooled browser session"""
+        self._closed = True
+        if self.pool is None:
+            return
+        
+        while not self.pool.empty():
+            browser_session = self.pool.get_nowait()
+            if browser_session is not None:
+                self._session_uses.pop(id(browser_session), None)
+                await self._close_session(browser_session)
+        self.pool = None
 
-        # Browser not available, try to install
-        logger.warning("❌ Chromium not found, attempting installation...")
+    @asynccontextmanager
+    async def _checkout_session(self) -> AsyncIterator[BrowserSession]:
+        """Yield a session on a pooled shared-browser context, or one of this agent's own"""
+        context_pool = get_browser_pool()
+        if context_pool is not None:
+            async with context_pool.acquire() as browser_context:
+                yield BrowserSession(browser_context=browser_context, browser_profile=self.browser_profile)
+            return
+        
+        # Shared browser not up yet (or it failed) - use this agent's sessions
+        browser_session = await self._acquire_session()
+        healthy = False
         try:
-            import subprocess
-            
-            # Install playwright first if not installed
-            logger.info("Installing playwright...")
-            subprocess.run(["pip", "install", "playwright"], check=True)
-            
-            # Install chromium browser
-            logger.info("Installing chromium browser...")
-            result = subprocess.run(["playwright", "install", "chromium"], 
-                                  capture_output=True, text=True, timeout=120)
-            
-            if result.returncode != 0:
-                logger.error(f"Playwright install failed: {result.stderr}")
-                # Try with deps
-                logger.info("Trying with system dependencies...")
-                subprocess.run(["playwright", "install-deps", "chromium"], timeout=180)
-                subprocess.run(["playwright", "install", "chromium"], timeout=120)
-            
-            logger.info("✅ Browser installation completed")
-            
-        except Exception as install_error:
-            logger.error(f"❌ Failed to install browser: {install_error}")
-            logger.error("Browser Use may not work properly")
-            # Don't raise - let the app continue and fail gracefully
+            yield browser_session
+            healthy = True
+        finally:
+            await self._release_session(browser_session, healthy=healthy)
 
-    async def search_food_options(self, search_request: SearchRequest) -> SearchResponse:
+    async def search_food_options(self, search_request: SearchRequest, refresh: bool = False) -> SearchResponse:
         """
         Main method to search for food options on Rappi based on user preferences
+        
+        With refresh=True the response cache is not read, so the search runs
+        for real; its result still replaces the cached one.
         """
         start_time = datetime.now()
-        self.session_id = f"rappi_search_{int(start_time.timestamp())}"
+        # Local: the job manager's agent runs several searches at once, and each
+        # response must report its own session; the attribute is for /search/status
+        session_id = f"rappi_search_{int(start_time.timestamp())}"
+        self.session_id = session_id
         
         try:
             logger.info(f"Starting food search for location: {search_request.location}")
             
-            # Create the search task for the Browser Use agent
-            task = self._build_search_task(search_request)
+            # Canned data for demos and testing - no browser, LLM or cache involved
+            if self.config.sample_mode:
+                search_results = self._create_sample_results(search_request)
+                return SearchResponse(
+                    success=True,
+                    results=search_results,
+                    search_metadata=self._build_metadata(search_request, start_time, len(search_results), session_id)
+                )
             
-            # Create browser session with explicit headless configuration
-            browser_session = BrowserSession(
-                browser_profile=self.browser_profile
-            )
+            # Serve repeated searches without launching a browser
+            cached_response = await self.cache.get(search_request, self.config) if self.cache and not refresh else None
+            if cached_response is not None:
+                logger.info(f"Returning cached search results (cache stats: {self.cache.stats})")
+                return cached_response
             
-            # Initialize and run the browser agent with headless configuration
-            agent = Agent(
-                task=task,
-                llm=self.llm,
-                browser_session=browser_session,
-                use_vision=self.config.use_vision,
-                max_actions_per_step=3,  # Reduced to prevent getting stuck on complex actions
-                max_steps=25  # Reduced to ensure faster completion
-            )
+            # Create the search task for the Browser Use agent
+            task = self._build_search_task(search_request)
             
-            # Execute the search
-            logger.info("Executing browser automation...")
-            result = await agent.run()
+            # Check out a warm browser session; the Agent itself is per task
+            async with self._checkout_session() as browser_session:
+                agent = Agent(
+                    task=task,
+                    llm=self.llm,
+                    browser_session=browser_session,
+                    use_vision=self.config.use_vision,
+                    max_actions_per_step=3,  # Reduced to prevent getting stuck on complex actions
+                    max_steps=25  # Reduced to ensure faster completion
+                )
+                
+                # Execute the search
+                logger.info("Executing browser automation...")
+                result = await agent.run()
             
             # Parse the results
-            search_results = self._parse_agent_results(result, search_request)
-            
-            # Calculate search time
-            end_time = datetime.now()
-            search_time = str(end_time - start_time)
-            
-            # Create metadata
-            metadata = SearchMetadata(
-                location=search_request.location,
-                total_found=len(search_results),
-                search_time=search_time,
-                search_timestamp=start_time.isoformat(),
-                browser_session_id=self.session_id
-            )
+            search_results = await self._parse_agent_results(result, search_request)
             
             response = SearchResponse(
                 success=True,
                 results=search_results,
-                search_metadata=metadata
+                search_metadata=self._build_metadata(search_request, start_time, len(search_results), session_id)
             )
             
             logger.info(f"Search completed successfully. Found {len(search_results)} results")
+            
+            if self.cache and search_results:
+                await self.cache.set(search_request, self.config, response)
+            
             return response
             
         except Exception as e:
             logger.error(f"Search failed: {str(e)}")
             
-            end_time = datetime.now()
-            search_time = str(end_time - start_time)
-            
-            metadata = SearchMetadata(
-                location=search_request.location,
-                total_found=0,
-                search_time=search_time,
-                search_timestamp=start_time.isoformat(),
-                browser_session_id=self.session_id or "unknown"
-            )
-            
             return SearchResponse(
                 success=False,
                 results=[],
-                search_metadata=metadata,
+                search_metadata=self._build_metadata(search_request, start_time, 0, session_id),
                 error_message=str(e)
             )
 
+    def _build_metadata(
+        self,
+        search_request: SearchRequest,
+        start_time: datetime,
+        total_found: int,
+        session_id: str
+    ) -> SearchMetadata:
+        """Build search metadata, timing the search from start_time"""
+        return SearchMetadata(
+            location=search_request.location,
+            total_found=total_found,
+            search_time=str(datetime.now() - start_time),
+            search_timestamp=start_time.isoformat(),
+            browser_session_id=session_id
+        )
+
     def _build_search_task(self, search_request: SearchRequest) -> str:
         """Build the task description for the Browser Use agent"""
 
         preferences = search_request.preferences
         task_parts = [
-            "Go to rappi.com.ar and immediately start searching for food delivery options.",
-            (
-                "PRIORITY: Focus on searching for restaurants and food options first. "
-                "The main goal is to find and extract restaurant information, not to set up location. "
-                f"LOCATION HANDLING: If needed, the location can be set to '{search_request.location}' using the element with selector 'div[data-qa=\"address-container\"]' at the top left. "
-                "However, DO NOT spend time trying to set location if it's not immediately obvious or if it causes delays. "
-                "You can proceed with the default location if restaurants are already showing. "
-                "IMPORTANT: Do not get stuck on address entry - if location setting is not working immediately, skip it and focus on searching for food options."
-            ),
+            f"Delivery location: {search_request.location}",
+            f"Number of restaurants to extract: up to {search_request.max_results}",
         ]
         
         # Add search query if specified
@@ -273,178 +386,37 @@ class RappiAgent:
         if preferences.min_rating > 0:
             task_parts.append(f"Only show restaurants with rating {preferences.min_rating} or higher")
         
-        # Instructions for data extraction
-        extraction_instructions = f"""
-        
-        SEARCH STRATEGY:
-        - Start browsing restaurants immediately without waiting for location confirmation
-        - Use the main search functionality to find restaurants
-        - If you see restaurants loading, proceed with data extraction
-        - Only attempt location setting if absolutely necessary and only for 1-2 attempts max
-        - Never spend more than 30 seconds on location/address entry
-        
-        Extract information for up to {search_request.max_results} restaurants, including:
-        1. Restaurant name
-        2. Cuisine type
-        3. Estimated delivery time
-        4. Restaurant rating
-        5. Delivery fee (if shown)
-        6. Direct URL/link to the restaurant page
-        7. Restaurant image URL (if available)
-        8. Address or location info
-        9. At least 2-3 popular menu items with names and prices
-        10. Any current promotions or discounts
-        11. Whether the restaurant is currently open
-        
-        For each menu item, capture:
-        - Item name
-        - Price in Argentine Pesos (ARS)
-        - Brief description if available
-        
-        Return the results in a structured JSON format that can be easily parsed.
-        Focus on accuracy and include real prices and delivery information.
-        Work with whatever restaurants are available - don't get stuck on location verification.
-        """
-        
-        task_parts.append(extraction_instructions)
-        
-        return " ".join(task_parts)
+        # Static instructions first so every task shares the same cacheable prefix
+        return _STATIC_TASK_PREFIX + "\n\nSEARCH PARAMETERS:\n" + "\n".join(task_parts)
 
-    def _parse_agent_results(self, agent_result, search_request: SearchRequest) -> List[RestaurantResult]:
+    async def _parse_agent_results(self, agent_result, search_request: SearchRequest) -> List[RestaurantResult]:
         """Parse the results from the Browser Use agent"""
-        results = []
-        
         try:
-            # Try to extract structured data from the agent result
-            # The agent result might contain extracted content or final result
-            if hasattr(agent_result, 'final_result'):
-                content = agent_result.final_result()
-            elif hasattr(agent_result, 'extracted_content'):
-                content = agent_result.extracted_content()
-            else:
-                content = str(agent_result)
+            content = _extract_content(agent_result)
             
             logger.info(f"Raw agent result: {content[:500]}...")
             
-            # Try to parse JSON if the content looks like JSON
-            if isinstance(content, str):
-                # Look for JSON-like structures in the content
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    try:
-                        parsed_data = json.loads(json_match.group())
-                        results = self._convert_parsed_data_to_results(parsed_data)
-                    except json.JSONDecodeError:
-                        pass
-            
-            # If we couldn't parse JSON, try to extract data manually
-            if not results:
-                results = self._extract_data_manually(content)
-            
-            # Limit results to max_results
-            return results[:search_request.max_results]
-            
-        except Exception as e:
-            logger.error(f"Error parsing agent results: {str(e)}")
-            # Return sample data for testing if parsing fails
-            return self._create_sample_results(search_request)
-
-    def _convert_parsed_data_to_results(self, data: Dict[str, Any]) -> List[RestaurantResult]:
-        """Convert parsed JSON data to RestaurantResult objects"""
-        results = []
-        
-        # Handle different possible JSON structures
-        restaurants_data = []
-        if 'restaurants' in data:
-            restaurants_data = data['restaurants']
-        elif 'results' in data:
-            restaurants_data = data['results']
-        elif isinstance(data, list):
-            restaurants_data = data
-        else:
-            # Single restaurant object
-            restaurants_data = [data]
-        
-        for restaurant_data in restaurants_data:
+            # JSON + regex + validation is CPU-bound; keep it off the event loop
+            # (and off the GIL) so concurrent searches keep driving their browsers
+            loop = asyncio.get_running_loop()
             try:
-                # Parse menu items
-                menu_items = []
-                if 'menu_items' in restaurant_data:
-                    for item_data in restaurant_data['menu_items']:
-                        menu_item = MenuItem(
-                            name=item_data.get('name', ''),
-                            price=item_data.get('price'),
-                            description=item_data.get('description', ''),
-                            image_url=item_data.get('image_url', ''),
-                            available=item_data.get('available', True)
-                        )
-                        menu_items.append(menu_item)
-                
-                # Create restaurant result
-                restaurant = RestaurantResult(
-                    restaurant_name=restaurant_data.get('name', restaurant_data.get('restaurant_name', 'Unknown')),
-                    cuisine_type=restaurant_data.get('cuisine_type', restaurant_data.get('cuisine', '')),
-                    estimated_price=restaurant_data.get('estimated_price', restaurant_data.get('price')),
-                    delivery_time=restaurant_data.get('delivery_time', ''),
-                    delivery_fee=restaurant_data.get('delivery_fee'),
-                    rating=restaurant_data.get('rating'),
-                    url=restaurant_data.get('url', restaurant_data.get('link', '')),
-                    image_url=restaurant_data.get('image_url', restaurant_data.get('image', '')),
-                    address=restaurant_data.get('address', restaurant_data.get('location', '')),
-                    menu_items=menu_items,
-                    is_open=restaurant_data.get('is_open', restaurant_data.get('open', True)),
-                    promotions=restaurant_data.get('promotions', restaurant_data.get('offers', []))
+                return await loop.run_in_executor(
+                    get_parse_pool(), parse_agent_output, content, search_request.max_results
                 )
-                results.append(restaurant)
-                
-            except Exception as e:
-                logger.warning(f"Error parsing restaurant data: {str(e)}")
-                continue
-        
-        return results
-
-    def _extract_data_manually(self, content: str) -> List[RestaurantResult]:
-        """Extract restaurant data manually from text content"""
-        results = []
-        
-        # This is a simplified manual extraction
-        # In a real implementation, you'd use more sophisticated text parsing
-        
-        # Look for common patterns in Rappi listings
-        restaurant_patterns = [
-            r'restaurante?\s*:?\s*([^,\n]+)',
-            r'([^,\n]+)\s*-\s*\d+\s*min',
-            r'([A-Z][^,\n]{5,50})\s*\$\s*\d+'
-        ]
-        
-        found_restaurants = set()
-        for pattern in restaurant_patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    match = match[0]
-                cleaned_name = match.strip()
-                if len(cleaned_name) > 3 and cleaned_name not in found_restaurants:
-                    found_restaurants.add(cleaned_name)
-        
-        # Create basic restaurant objects
-        for name in list(found_restaurants)[:5]:  # Limit to 5 for manual extraction
-            restaurant = RestaurantResult(
-                restaurant_name=name,
-                cuisine_type="",
-                estimated_price=None,
-                delivery_time="30-45 min",
-                url="https://rappi.com.ar",
-                menu_items=[]
-            )
-            results.append(restaurant)
-        
-        return results
+            except BrokenProcessPool:
+                logger.warning("Parse process pool died, recreating it and parsing in-process")
+                reset_parse_pool()
+                return parse_agent_output(content, search_request.max_results)
+            
+        except Exception:
+            # Surface the failure - the search is reported as unsuccessful and not cached
+            logger.exception("Error parsing agent results")
+            raise
 
     def _create_sample_results(self, search_request: SearchRequest) -> List[RestaurantResult]:
-        """Create sample results for testing when real data extraction fails"""
+        """Create sample results for testing (AgentConfig.sample_mode)"""
         
-        logger.warning("Creating sample results - real extraction failed")
+        logger.warning("Returning sample results - sample mode is enabled")
         
         sample_restaurants = [
             {
@@ -485,14 +457,14 @@ class RappiAgent:
         results = []
         for restaurant_data in sample_restaurants[:search_request.max_results]:
             menu_items = [
-                MenuItem(
+                MenuItem.model_construct(
                     name=item["name"],
                     price=item["price"],
                     description=item["description"]
                 ) for item in restaurant_data["items"]
             ]
             
-            restaurant = RestaurantResult(
+            restaurant = RestaurantResult.model_construct(
                 restaurant_name=restaurant_data["name"],
                 cuisine_type=restaurant_data["cuisine"],
                 estimated_price=restaurant_data["price"],
@@ -506,4 +478,4 @@ class RappiAgent:
             )
             results.append(restaurant)
         
-        return results
\ No newline at end of file
+        return results
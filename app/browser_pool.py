@@ -0,0 +1,185 @@
+"""
+Pool of pre-created browser contexts on the shared Playwright browser
+
+Food searches check a context out instead of creating one per job. The pool
+size also caps how many searches drive the browser at once, so parallel jobs
+queue for a context rather than all competing for CPU and memory.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from playwright.async_api import Browser, BrowserContext
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("POOL_SIZE", "4"))
+# Jobs served by one context before it is closed and replaced
+MAX_USES_PER_INSTANCE = int(os.getenv("MAX_USES_PER_INSTANCE", "50"))
+
+# Page setup shared by pooled contexts and the agent's own browser sessions
+VIEWPORT = {"width": 1920, "height": 1080}
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
+
+# Launch settings shared by the startup browser and the agent's own sessions
+HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
+
+# Browser arguments for containerized/production environment
+BROWSER_ARGS = (
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-features=TranslateUI,VizDisplayCompositor",
+    "--disable-ipc-flooding-protection",
+    "--enable-features=NetworkService",
+    "--force-color-profile=srgb",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-extensions-except=/tmp/ublock,/tmp/clearurls,/tmp/cookies",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-default-apps",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--blink-settings=imagesEnabled=false",
+)
+
+# For very low memory environments
+if os.getenv("DISABLE_DEV_SHM_USAGE", "false").lower() == "true":
+    BROWSER_ARGS += (
+        "--memory-pressure-off",
+        "--max_old_space_size=4096",
+    )
+
+# Resource types aborted in the agent's browser; only DOM text and prices are
+# extracted. Stylesheets are opt-in: Browser Use picks interactive elements
+# from the rendered layout, which unstyled pages distort.
+BLOCKED_RESOURCE_TYPES = frozenset(
+    resource_type.strip()
+    for resource_type in os.getenv("BROWSER_BLOCKED_RESOURCES", "image,font,media").split(",")
+    if resource_type.strip()
+)
+
+
+async def _block_heavy_resources(route):
+    """Playwright route handler that drops images, fonts and media"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def block_resources(browser_context: BrowserContext):
+    """Abort the resource types listed in BROWSER_BLOCKED_RESOURCES"""
+    if BLOCKED_RESOURCE_TYPES:
+        await browser_context.route("**/*", _block_heavy_resources)
+
+
+class BrowserContextPool:
+    """Fixed set of reusable browser contexts on one browser"""
+
+    def __init__(self, browser: Browser, size: int = POOL_SIZE, max_uses: int = MAX_USES_PER_INSTANCE):
+        self.browser = browser
+        self.size = size
+        self.max_uses = max_uses
+        # Idle contexts (None = slot whose context gets created on checkout)
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._uses: Dict[int, int] = {}
+
+    async def start(self):
+        """Create the contexts up front so searches skip context setup"""
+        for _ in range(self.size):
+            try:
+                self._idle.put_nowait(await self._new_context())
+            except Exception as e:
+                # Leave an empty slot - it is created on first checkout instead
+                logger.warning(f"Could not pre-create browser context: {e}")
+                self._idle.put_nowait(None)
+
+        logger.info(f"Browser context pool ready with {self.size} contexts")
+
+    async def _new_context(self) -> BrowserContext:
+        browser_context = await self.browser.new_context(viewport=VIEWPORT, user_agent=USER_AGENT)
+        await block_resources(browser_context)
+        self._uses[id(browser_context)] = 0
+        return browser_context
+
+    async def get(self) -> BrowserContext:
+        """Wait for an idle context"""
+        browser_context = await self._idle.get()
+        if browser_context is None:
+            try:
+                browser_context = await self._new_context()
+            except Exception:
+                self._idle.put_nowait(None)
+                raise
+        return browser_context
+
+    async def release(self, browser_context: BrowserContext, healthy: bool = True):
+        """Return a context to the pool, replacing it if it is worn out or broken"""
+        uses = self._uses.pop(id(browser_context), 0) + 1
+
+        if healthy and uses < self.max_uses:
+            try:
+                # Don't carry pages or cookies over to the next search
+                for page in browser_context.pages:
+                    await page.close()
+                await browser_context.clear_cookies()
+                self._uses[id(browser_context)] = uses
+                self._idle.put_nowait(browser_context)
+                return
+            except Exception as e:
+                logger.warning(f"Could not reset browser context, replacing it: {e}")
+
+        await self._close_context(browser_context)
+        self._idle.put_nowait(None)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[BrowserContext]:
+        """Check a context out for the duration of the block"""
+        browser_context = await self.get()
+        healthy = False
+        try:
+            yield browser_context
+            healthy = True
+        finally:
+            await self.release(browser_context, healthy=healthy)
+
+    @property
+    def available(self) -> int:
+        """Number of contexts not checked out"""
+        return self._idle.qsize()
+
+    async def close(self):
+        """Close every idle context"""
+        while not self._idle.empty():
+            browser_context = self._idle.get_nowait()
+            if browser_context is not None:
+                self._uses.pop(id(browser_context), None)
+                await self._close_context(browser_context)
+
+    async def _close_context(self, browser_context: BrowserContext):
+        try:
+            await browser_context.close()
+        except Exception as e:
+            logger.warning(f"Error closing browser context: {e}")
+
+
+# Global pool, set by the application lifespan once the browser is up
+_browser_pool: Optional[BrowserContextPool] = None
+
+
+def get_browser_pool() -> Optional[BrowserContextPool]:
+    """Get the global browser context pool, or None if the browser is not up"""
+    return _browser_pool
+
+
+def set_browser_pool(pool: Optional[BrowserContextPool]):
+    """Install (or clear) the global browser context pool"""
+    global _browser_pool
+    _browser_pool = pool
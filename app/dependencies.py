@@ -0,0 +1,11 @@
+"""
+FastAPI dependencies for resources created in the application lifespan
+"""
+from fastapi import Request
+
+from app.agents.pool import AgentPool
+
+
+def get_agent_pool(request: Request) -> AgentPool:
+    """Get this process's agent pool for /search requests"""
+    return request.app.state.agent_pool
@@ -2,11 +2,13 @@
 Job Manager for handling async Browser Use tasks
 """
 import asyncio
+import itertools
 import logging
-from typing import Dict, List, Optional, Any
+import os
+import random
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
-import threading
 from contextlib import asynccontextmanager
 
 from app.models import (
@@ -17,19 +19,52 @@ from app.agents.rappi_agent import RappiAgent
 
 logger = logging.getLogger(__name__)
 
+# Statuses a job never leaves; these are the ones eligible for eviction
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
 
 class JobManager:
     """Manages job queue and execution for Browser Use tasks"""
     
-    def __init__(self, max_workers: int = 2):
+    def __init__(
+        self,
+        agent: Optional[RappiAgent] = None,
+        max_workers: Optional[int] = None,
+        retention_seconds: Optional[int] = None,
+        max_retained: Optional[int] = None
+    ):
+        # One agent shared by every food search job, built by the first one
+        self.agent = agent
+        # All retained jobs, in creation order
         self.jobs: Dict[str, Job] = {}
-        self.job_queue: asyncio.Queue = asyncio.Queue()
-        self.max_workers = max_workers
+        # Per-status indices, in the order jobs entered that status
+        self._by_status: Dict[JobStatus, "OrderedDict[str, Job]"] = {
+            status: OrderedDict() for status in JobStatus
+        }
+        # Finished jobs in completion order - the eviction LRU
+        self._completed: "OrderedDict[str, Job]" = OrderedDict()
+        self.retention_seconds = retention_seconds if retention_seconds is not None else int(
+            float(os.getenv("JOB_RETENTION_HOURS", "24")) * 3600
+        )
+        self.max_retained = max_retained if max_retained is not None else int(
+            os.getenv("JOB_MAX_RETAINED", "1000")
+        )
+        self._gc_task: Optional[asyncio.Task] = None
+        self.job_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._queue_counter = itertools.count()  # FIFO tiebreaker within a priority
+        # Worker coroutines on the event loop; each runs one job at a time
+        self.max_workers = max_workers if max_workers is not None else int(
+            os.getenv("JOB_WORKERS", "4")
+        )
+        self._worker_tasks: List[asyncio.Task] = []
+        # Set by the app once the startup browser warm-up is over
+        self.browser_ready: Optional[asyncio.Event] = None
         self.workers_running = False
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.lock = threading.RLock()
+        # Everything runs on one event loop, so plain dict reads/writes need no
+        # lock; this only groups multi-field job transitions in the workers
+        self._alock = asyncio.Lock()
         
-        logger.info(f"JobManager initialized with {max_workers} workers")
+        logger.info(f"JobManager initialized with {self.max_workers} workers")
     
     async def start_workers(self):
         """Start background workers to process jobs"""
@@ -37,81 +72,155 @@ class JobManager:
             return
             
         self.workers_running = True
+        
         logger.info("Starting job workers...")
         
         # Start worker tasks
-        for i in range(self.max_workers):
+        self._worker_tasks = [
             asyncio.create_task(self._worker(f"worker-{i}"))
+            for i in range(self.max_workers)
+        ]
+        
+        self._gc_task = asyncio.create_task(self._gc_loop())
     
     async def stop_workers(self):
         """Stop background workers"""
         self.workers_running = False
         logger.info("Stopping job workers...")
+        
+        tasks = self._worker_tasks
+        if self._gc_task:
+            tasks.append(self._gc_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._gc_task = None
+        
+        if self.agent is not None:
+            await self.agent.aclose()
+            self.agent = None
     
     def create_job(self, job_request: JobRequest) -> Job:
         """Create a new job and add it to the queue"""
-        job = Job(
+        # job_request was validated by the route; skip validating it again
+        job = Job.model_construct(
             job_type=job_request.job_type,
             job_data=job_request.job_data,
             priority=job_request.priority,
             timeout_seconds=job_request.timeout_seconds
         )
         
-        with self.lock:
-            self.jobs[job.id] = job
+        self.jobs[job.id] = job
+        self._by_status[job.status][job.id] = job
         
-        # Add to queue (higher priority = lower number for priority queue)
-        self.job_queue.put_nowait((job.priority, job.id))
+        self._enqueue(job)
         
         logger.info(f"Created job {job.id} of type {job.job_type}")
         return job
     
+    def _enqueue(self, job: Job):
+        """Add a job to the queue, highest priority first"""
+        # PriorityQueue pops the smallest entry, so negate (10 = highest priority)
+        self.job_queue.put_nowait((-job.priority, next(self._queue_counter), job.id))
+    
+    def _set_status(self, job: Job, status: JobStatus):
+        """Change a job's status and move it to the matching indices"""
+        self._by_status[job.status].pop(job.id, None)
+        self._completed.pop(job.id, None)
+        job._response_bytes = None
+        job.status = status
+        self._by_status[status][job.id] = job
+        if status in TERMINAL_STATUSES:
+            self._completed[job.id] = job
+    
+    def _evict_finished(self):
+        """Drop finished jobs past the retention window or beyond max_retained"""
+        cutoff = datetime.now() - timedelta(seconds=self.retention_seconds)
+        evicted = 0
+        # Oldest finished jobs are at the front
+        while self._completed:
+            job_id, job = next(iter(self._completed.items()))
+            if len(self._completed) <= self.max_retained and job.completed_at and job.completed_at > cutoff:
+                break
+            self._completed.popitem(last=False)
+            self._by_status[job.status].pop(job_id, None)
+            self.jobs.pop(job_id, None)
+            evicted += 1
+        
+        if evicted:
+            logger.info(f"Evicted {evicted} finished jobs")
+    
+    async def _gc_loop(self, interval: float = 60.0):
+        """Periodically evict finished jobs to keep memory bounded"""
+        while self.workers_running:
+            await asyncio.sleep(interval)
+            self._evict_finished()
+    
     def get_job(self, job_id: str) -> Optional[Job]:
         """Get job by ID"""
-        with self.lock:
-            return self.jobs.get(job_id)
+        return self.jobs.get(job_id)
     
-    def list_jobs(self, status: Optional[JobStatus] = None, limit: int = 20) -> List[Job]:
-        """List jobs, optionally filtered by status"""
-        with self.lock:
-            jobs = list(self.jobs.values())
+    def list_jobs_paginated(
+        self,
+        status: Optional[JobStatus] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Job], int]:
+        """List one page of jobs, optionally filtered by status, plus the total matching
         
-        if status:
-            jobs = [job for job in jobs if job.status == status]
+        Newest first: by creation time, or by when they entered the status when filtered.
+        """
+        index = self._by_status[status] if status else self.jobs
+        total = len(index)
         
-        # Sort by creation time (newest first)
-        jobs.sort(key=lambda x: x.created_at, reverse=True)
-        
-        return jobs[:limit]
+        # Walk in from whichever end of the index is closer to the page, so
+        # deep pages don't step over every newer job first
+        end = total - offset
+        if end <= 0:
+            return [], total
+        start = max(0, end - limit)
+        if offset <= start:
+            page = list(itertools.islice(reversed(index.values()), offset, offset + limit))
+        else:
+            page = list(itertools.islice(index.values(), start, end))
+            page.reverse()
+        return page, total
+    
+    def get_counts(self) -> Dict[str, int]:
+        """Number of retained jobs, in total and per status"""
+        # The per-status indices are kept current by _set_status, so this is
+        # a handful of len() calls rather than a scan over every job
+        counts = {"total_jobs": len(self.jobs)}
+        for status, index in self._by_status.items():
+            counts[status.value] = len(index)
+        return counts
     
     def cancel_job(self, job_id: str) -> bool:
         """Cancel a pending job"""
-        with self.lock:
-            job = self.jobs.get(job_id)
-            if job and job.status == JobStatus.PENDING:
-                job.status = JobStatus.CANCELLED
-                job.completed_at = datetime.now()
-                logger.info(f"Cancelled job {job_id}")
-                return True
+        job = self.jobs.get(job_id)
+        if job and job.status == JobStatus.PENDING:
+            job.completed_at = datetime.now()
+            self._set_status(job, JobStatus.CANCELLED)
+            logger.info(f"Cancelled job {job_id}")
+            return True
         return False
     
     async def _worker(self, worker_name: str):
         """Background worker to process jobs"""
         logger.info(f"{worker_name} started")
         
+        # Don't start on a job while the shared browser is still launching
+        if self.browser_ready is not None:
+            await self.browser_ready.wait()
+        
         while self.workers_running:
             try:
-                # Get next job from queue with timeout
-                try:
-                    priority, job_id = await asyncio.wait_for(
-                        self.job_queue.get(), timeout=1.0
-                    )
-                except asyncio.TimeoutError:
-                    continue
+                # Wait for the next job; stop_workers cancels this wait
+                _, _, job_id = await self.job_queue.get()
                 
                 # Get job details
-                with self.lock:
-                    job = self.jobs.get(job_id)
+                job = self.jobs.get(job_id)
                 
                 if not job or job.status != JobStatus.PENDING:
                     continue
@@ -132,8 +241,8 @@ class JobManager:
         
         try:
             # Mark job as running
-            with self.lock:
-                job.status = JobStatus.RUNNING
+            async with self._alock:
+                self._set_status(job, JobStatus.RUNNING)
                 job.started_at = datetime.now()
                 job.progress.step_description = "Initializing..."
                 job.progress.progress_percentage = 0.0
@@ -147,9 +256,9 @@ class JobManager:
                 raise ValueError(f"Unknown job type: {job.job_type}")
             
             # Mark job as completed
-            with self.lock:
-                job.status = JobStatus.COMPLETED
+            async with self._alock:
                 job.completed_at = datetime.now()
+                self._set_status(job, JobStatus.COMPLETED)
                 job.result = result
                 job.progress.progress_percentage = 100.0
                 job.progress.step_description = "Completed"
@@ -160,83 +269,80 @@ class JobManager:
             # Mark job as failed
             logger.error(f"{worker_name} failed job {job_id}: {e}")
             
-            with self.lock:
-                job.status = JobStatus.FAILED
+            async with self._alock:
                 job.completed_at = datetime.now()
+                self._set_status(job, JobStatus.FAILED)
                 job.error_message = str(e)
                 job.progress.step_description = f"Failed: {str(e)}"
                 
                 # Retry logic
                 if job.retry_count < job.max_retries:
                     job.retry_count += 1
-                    job.status = JobStatus.PENDING
+                    self._set_status(job, JobStatus.PENDING)
                     job.started_at = None
                     job.completed_at = None
                     job.error_message = None
                     job.progress = JobProgress()
                     
-                    # Re-queue the job
-                    self.job_queue.put_nowait((job.priority, job.id))
-                    logger.info(f"Retrying job {job_id} (attempt {job.retry_count}/{job.max_retries})")
+                    # Re-queue after an exponential, jittered backoff so a broken
+                    # upstream doesn't spin workers through back-to-back retries
+                    delay = min(60, 2 ** job.retry_count) * random.uniform(0.8, 1.2)
+                    asyncio.get_running_loop().call_later(delay, self._enqueue, job)
+                    logger.info(f"Retrying job {job_id} in {delay:.1f}s (attempt {job.retry_count}/{job.max_retries})")
+    
+    def _get_agent(self) -> RappiAgent:
+        """Get the shared search agent, creating it on first use"""
+        # RappiAgent requires OPENAI_API_KEY; building it here rather than at
+        # startup means a missing key fails search jobs, not the whole app
+        if self.agent is None:
+            # Every worker may be running a search on it at once
+            self.agent = RappiAgent(session_pool_size=self.max_workers)
+        return self.agent
     
     async def _execute_food_search(self, job: Job) -> Dict[str, Any]:
         """Execute a food search job"""
         job_data = job.job_data
         
         # Update progress
-        with self.lock:
-            job.progress.current_step = 1
-            job.progress.total_steps = 4
-            job.progress.step_description = "Creating search request..."
-            job.progress.progress_percentage = 25.0
+        job.progress.current_step = 1
+        job.progress.total_steps = 3
+        job.progress.step_description = "Creating search request..."
+        job.progress.progress_percentage = 25.0
         
         # Convert job_data to SearchRequest
         search_request = SearchRequest(**job_data)
         
         # Update progress
-        with self.lock:
-            job.progress.current_step = 2
-            job.progress.step_description = "Initializing browser agent..."
-            job.progress.progress_percentage = 50.0
-        
-        # Execute the search using RappiAgent
-        agent = RappiAgent()
-        
-        # Update progress
-        with self.lock:
-            job.progress.current_step = 3
-            job.progress.step_description = "Searching Rappi..."
-            job.progress.progress_percentage = 75.0
+        job.progress.current_step = 2
+        job.progress.step_description = "Searching Rappi..."
+        job.progress.progress_percentage = 50.0
         
-        # Run the search in a thread to avoid blocking
-        loop = asyncio.get_event_loop()
-        search_response = await loop.run_in_executor(
-            self.executor,
-            lambda: asyncio.run(agent.search_food_options(search_request))
-        )
+        # The search is already async - run it on the workers' own event loop
+        search_response = await self._get_agent().search_food_options(search_request)
         
         # Update progress
-        with self.lock:
-            job.progress.current_step = 4
-            job.progress.step_description = "Processing results..."
-            job.progress.progress_percentage = 100.0
+        job.progress.current_step = 3
+        job.progress.step_description = "Processing results..."
+        job.progress.progress_percentage = 100.0
         
         # Convert response to dict for storage
-        return search_response.dict()
+        return search_response.model_dump()
     
     async def _execute_health_check(self, job: Job) -> Dict[str, Any]:
         """Execute a health check job"""
-        with self.lock:
-            job.progress.step_description = "Running health check..."
-            job.progress.progress_percentage = 50.0
-        
-        # Simple health check
-        await asyncio.sleep(2)  # Simulate some work
+        job.progress.step_description = "Running health check..."
+        job.progress.progress_percentage = 50.0
         
+        # Report live job system state; nothing here should hold a worker
         return {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
-            "message": "Browser Use system is operational"
+            "message": "Browser Use system is operational",
+            "total_jobs": len(self.jobs),
+            "finished_jobs": len(self._completed),
+            "max_retained": self.max_retained,
+            "queue_depth": self.job_queue.qsize(),
+            "running": len(self._by_status[JobStatus.RUNNING])
         }
 
 
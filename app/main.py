@@ -1,67 +1,158 @@
 """
 FastAPI main application for Browser Use Rappi Agent
 """
+import asyncio
 import os
+import queue
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import httpx
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
 # Load environment variables
 load_dotenv()
 
 # Import routes
-from app.routes.search import router as search_router
+from app.routes.search import router as search_router, SEARCH_WARM_INTERVAL, warm_search_cache_loop
 from app.routes.jobs import router as jobs_router
-from app.models import HealthResponse
+from app.models import AgentConfig, HealthResponse
+from app.agents.pool import AgentPool
+from app.middleware import PreflightMiddleware
 from app.jobs import job_manager_lifespan, get_job_manager
+from app.agents import launch_chromium
+from app.browser_pool import BROWSER_ARGS, HEADLESS, BrowserContextPool, set_browser_pool
+from app.agents.cache import get_llm_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def _warmup_browser(app: FastAPI):
+    """Check chromium and launch the shared browser without blocking startup"""
+    try:
+        # Import here to avoid circular imports
+        from playwright.async_api import async_playwright
+        
+        # An external browser lets several worker processes share one Chromium
+        cdp_endpoint = os.getenv("BROWSER_CDP_ENDPOINT")
+        if cdp_endpoint:
+            app.state.playwright = await async_playwright().start()
+            app.state.browser = await app.state.playwright.chromium.connect_over_cdp(cdp_endpoint)
+            logger.info(f"✅ Connected to shared browser at {cdp_endpoint}")
+        else:
+            # The launch itself is the availability check - no separate probe
+            app.state.playwright = await async_playwright().start()
+            app.state.browser = await launch_chromium(
+                app.state.playwright,
+                headless=HEADLESS,
+                args=list(BROWSER_ARGS)
+            )
+            logger.info("✅ Shared browser warmed up")
+        
+        # Searches check pre-created contexts on this browser out from now on
+        browser_pool = BrowserContextPool(app.state.browser)
+        await browser_pool.start()
+        app.state.browser_pool = browser_pool
+        set_browser_pool(browser_pool)
+    except Exception as browser_error:
+        # Don't exit here - let the app keep serving and log the issue
+        logger.error(f"❌ Browser warm-up failed: {str(browser_error)}")
+    finally:
+        # Ready or failed, the warm-up is over; jobs and /health stop waiting
+        app.state.browser_ready.set()
+
+
+def _start_log_listener() -> QueueListener:
+    """Move the root log handlers onto a background thread"""
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    log_queue: queue.Queue = queue.Queue(-1)
+    
+    # Request handlers then only enqueue records; the thread does the writes
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+def _stop_log_listener(listener: QueueListener):
+    """Flush queued records and give the root logger its handlers back"""
+    listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
+
+
+async def _close_browser(app: FastAPI):
+    """Stop the warm-up task and close the shared browser"""
+    warmup_task = getattr(app.state, "warmup_task", None)
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    
+    browser_pool = getattr(app.state, "browser_pool", None)
+    if browser_pool is not None:
+        set_browser_pool(None)
+        await browser_pool.close()
+        app.state.browser_pool = None
+    
+    browser = getattr(app.state, "browser", None)
+    if browser is not None:
+        await browser.close()
+        app.state.browser = None
+    
+    playwright = getattr(app.state, "playwright", None)
+    if playwright is not None:
+        await playwright.stop()
+        app.state.playwright = None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     logger.info("Starting Browser Use Rappi Agent API...")
+    log_listener = _start_log_listener()
     
     # Startup
     try:
-        # Test browser availability at startup
-        logger.info("Testing browser initialization...")
+        # One pooled HTTP client for outbound API calls, so keep-alive and TLS
+        # sessions are reused instead of reconnecting per call
+        app.state.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+        get_llm_cache().set_http_client(app.state.http)
         
-        # Import here to avoid circular imports
-        from playwright.sync_api import sync_playwright
+        # Agents for /search, per process so the app can run several workers
+        app.state.agent_pool = AgentPool(config=AgentConfig())
         
-        try:
-            with sync_playwright() as p:
-                logger.info("Testing chromium launch...")
-                browser = p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu'
-                    ]
-                )
-                logger.info("✅ Chromium launched successfully")
-                browser.close()
-                logger.info("✅ Browser test completed successfully")
-        except Exception as browser_error:
-            logger.error(f"❌ Browser test failed: {str(browser_error)}")
-            logger.error(f"Error type: {type(browser_error).__name__}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
-            # Don't exit here - let the app start but log the issue
-            logger.warning("Browser test failed but continuing with application startup")
+        # Optionally keep popular searches cached from the background
+        app.state.search_warm_task = None
+        if SEARCH_WARM_INTERVAL > 0:
+            app.state.search_warm_task = asyncio.create_task(warm_search_cache_loop(app))
         
-        # Start job manager workers
+        # Warm the browser in the background; nothing below waits for it
+        app.state.browser = None
+        app.state.browser_pool = None
+        app.state.playwright = None
+        app.state.browser_ready = asyncio.Event()
+        app.state.warmup_task = asyncio.create_task(_warmup_browser(app))
+        
+        # Start job manager workers; they hold jobs until the warm-up is over
         logger.info("Starting job manager...")
         job_manager = get_job_manager()
+        job_manager.browser_ready = app.state.browser_ready
         await job_manager.start_workers()
         logger.info("✅ Job manager started successfully")
         
@@ -69,10 +160,23 @@ async def lifespan(app: FastAPI):
         yield
     finally:
         # Cleanup
+        search_warm_task = getattr(app.state, "search_warm_task", None)
+        if search_warm_task is not None:
+            search_warm_task.cancel()
+            await asyncio.gather(search_warm_task, return_exceptions=True)
+        
         logger.info("Stopping job manager...")
         job_manager = get_job_manager()
         await job_manager.stop_workers()
+        await _close_browser(app)
+        agent_pool = getattr(app.state, "agent_pool", None)
+        if agent_pool is not None:
+            await agent_pool.aclose()
+        http = getattr(app.state, "http", None)
+        if http is not None:
+            await http.aclose()
         logger.info("Application shutdown")
+        _stop_log_listener(log_listener)
 
 
 # Create FastAPI application
@@ -80,27 +184,43 @@ app = FastAPI(
     title="Browser Use Rappi Agent",
     description="AI-powered food search agent for rappi.com.ar using Browser Use",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson serializes the nested job/search payloads much faster than stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS for production deployment
 cors_origins_env = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
-cors_origins = [origin.strip() for origin in cors_origins_env.split(",")]
 
-# Add common development and production origins
-cors_origins.extend([
+# Configured origins plus common development ones, deduplicated once at import
+cors_origins = sorted({
+    *filter(None, map(str.strip, cors_origins_env.split(","))),
     "http://localhost:3000",
     "http://127.0.0.1:3000",
     "http://localhost:8080",
     "http://127.0.0.1:8080"
-])
+})
+
+cors_methods = ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+# Let browsers cache preflight responses instead of re-sending OPTIONS
+cors_max_age = int(os.getenv("CORS_MAX_AGE", "86400"))
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=cors_methods,
     allow_headers=["*"],
+    max_age=cors_max_age,
+)
+
+# Added last so it runs first: preflights from allowed origins are answered
+# here, before the rest of the middleware stack and routing
+app.add_middleware(
+    PreflightMiddleware,
+    allow_origins=cors_origins,
+    allow_methods=cors_methods,
+    max_age=cors_max_age,
 )
 
 # Include routers
@@ -122,7 +242,22 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     try:
-        # You could add actual health checks here (database, browser, etc.)
+        # The browser warms up in the background after startup
+        browser_ready = getattr(app.state, "browser_ready", None)
+        if browser_ready is None or not browser_ready.is_set():
+            return HealthResponse(
+                status="starting",
+                message="Browser is warming up",
+                version="1.0.0"
+            )
+        
+        if app.state.browser is None:
+            return HealthResponse(
+                status="degraded",
+                message="Shared browser unavailable; searches launch their own",
+                version="1.0.0"
+            )
+        
         return HealthResponse(
             status="healthy",
             message="All services are operational",
@@ -133,15 +268,29 @@ async def health_check():
         raise HTTPException(status_code=503, detail="Service unavailable")
 
 
-@app.exception_handler(Exception)
-async def global_exception_handler(request, exc):
-    """Global exception handler"""
-    logger.error(f"Global exception: {str(exc)}")
-    return JSONResponse(
-        status_code=500,
+@app.exception_handler(ValueError)
+async def value_error_handler(request, exc):
+    """Invalid input that got past request validation"""
+    # Tracebacks only when debugging; one line per error otherwise
+    logger.warning(f"Invalid request to {request.url.path}: {exc}", exc_info=logger.isEnabledFor(logging.DEBUG))
+    return ORJSONResponse(
+        status_code=400,
+        content={
+            "detail": str(exc),
+            "type": "invalid_request"
+        }
+    )
+
+
+@app.exception_handler(PlaywrightTimeoutError)
+async def browser_timeout_handler(request, exc):
+    """Browser automation that ran out of time"""
+    logger.warning(f"Browser timeout on {request.url.path}: {exc}", exc_info=logger.isEnabledFor(logging.DEBUG))
+    return ORJSONResponse(
+        status_code=504,
         content={
-            "detail": "Internal server error",
-            "type": "internal_error"
+            "detail": "Browser operation timed out",
+            "type": "browser_timeout"
         }
     )
 
@@ -0,0 +1,49 @@
+"""
+ASGI middleware for the API
+"""
+from typing import Iterable
+
+
+class PreflightMiddleware:
+    """Answer CORS preflight requests from allowed origins before routing"""
+
+    def __init__(self, app, allow_origins: Iterable[str], allow_methods: Iterable[str], max_age: int = 86400):
+        self.app = app
+        self.allow_origins = frozenset(allow_origins)
+        allow_methods = list(allow_methods)
+        self.allowed_methods = frozenset(method.encode() for method in allow_methods)
+        # Header values are the same for every preflight, so encode them once
+        self.allow_methods = ", ".join(allow_methods).encode()
+        self.max_age = str(max_age).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        origin = headers.get(b"origin")
+        # Anything that isn't a preflight from an allowed origin goes through
+        # CORSMiddleware as usual (which rejects unknown origins)
+        if (
+            origin is None
+            or headers.get(b"access-control-request-method") not in self.allowed_methods
+            or origin.decode("latin-1") not in self.allow_origins
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        response_headers = [
+            (b"access-control-allow-origin", origin),
+            (b"access-control-allow-credentials", b"true"),
+            (b"access-control-allow-methods", self.allow_methods),
+            (b"access-control-max-age", self.max_age),
+            (b"vary", b"Origin"),
+        ]
+        # allow_headers=["*"]: echo back whatever the browser asked for
+        requested_headers = headers.get(b"access-control-request-headers")
+        if requested_headers:
+            response_headers.append((b"access-control-allow-headers", requested_headers))
+
+        await send({"type": "http.response.start", "status": 204, "headers": response_headers})
+        await send({"type": "http.response.body", "body": b""})
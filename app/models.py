@@ -2,7 +2,7 @@
 Pydantic models for API request/response structures
 """
 from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 from enum import Enum
 from datetime import datetime
 import uuid
@@ -51,7 +51,10 @@ class SearchPreferences(BaseModel):
 
 class SearchRequest(BaseModel):
     """Request model for food search"""
-    location: str = Field(..., description="Location for food delivery (e.g., 'Buenos Aires, Argentina')")
+    # Surrounding whitespace is stripped, so a blank location fails min_length
+    model_config = ConfigDict(str_strip_whitespace=True)
+    
+    location: str = Field(..., min_length=1, description="Location for food delivery (e.g., 'Buenos Aires, Argentina')")
     preferences: Optional[SearchPreferences] = Field(default_factory=SearchPreferences, description="Search preferences")
     max_results: Optional[int] = Field(default=10, ge=1, le=50, description="Maximum number of results to return")
     search_query: Optional[str] = Field(default="", description="Specific search query or food item")
@@ -120,8 +123,11 @@ class AgentConfig(BaseModel):
     timeout: Optional[int] = Field(default=60, description="Browser timeout in seconds")
     max_retries: Optional[int] = Field(default=3, description="Maximum number of retries")
     llm_model: Optional[str] = Field(default="gpt-4o-mini", description="LLM model to use")
+    llm_temperature: Optional[float] = Field(default=0.0, ge=0.0, le=2.0, description="LLM sampling temperature (0 enables response caching)")
     use_vision: Optional[bool] = Field(default=True, description="Use vision capabilities")
     save_screenshots: Optional[bool] = Field(default=False, description="Save screenshots during execution")
+    sample_mode: Optional[bool] = Field(default=False, description="Return sample data instead of running the browser agent")
+    pool_size: Optional[int] = Field(default=3, ge=1, le=10, description="Agents available for concurrent /search requests")
 
 
 class ErrorResponse(BaseModel):
@@ -194,6 +200,9 @@ class Job(BaseModel):
     timeout_seconds: int = Field(default=300, description="Job timeout")
     retry_count: int = Field(default=0, description="Number of retries attempted")
     max_retries: int = Field(default=3, description="Maximum retry attempts")
+    
+    # Serialized GET /jobs/{id} response, kept once the job reaches a final status
+    _response_bytes: Optional[bytes] = PrivateAttr(default=None)
 
 
 class JobResponse(BaseModel):
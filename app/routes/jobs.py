@@ -2,20 +2,53 @@
 Job system API endpoints
 """
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from datetime import timedelta
 
 from app.models import (
     JobRequest, JobResponse, JobListResponse, Job, JobStatus, JobType,
     SearchRequest, ErrorResponse
 )
 from app.jobs import get_job_manager
+from app.jobs.job_manager import TERMINAL_STATUSES
+from app.browser_pool import get_browser_pool
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Status messages for GET /jobs/{job_id}, and the shorter ones used by GET /jobs
+_STATUS_MESSAGES = {
+    JobStatus.PENDING: "Job is queued for processing",
+    JobStatus.RUNNING: "Job is running: {step}",
+    JobStatus.COMPLETED: "Job completed successfully",
+    JobStatus.FAILED: "Job failed: {error}",
+    JobStatus.CANCELLED: "Job was cancelled",
+}
+_LIST_STATUS_MESSAGES = {
+    JobStatus.PENDING: "Queued for processing",
+    JobStatus.RUNNING: "Running: {step}",
+    JobStatus.COMPLETED: "Completed successfully",
+    JobStatus.FAILED: "Failed: {error}",
+    JobStatus.CANCELLED: "Cancelled",
+}
+
+
+def _job_response(job: Job, messages: Dict[JobStatus, str] = _STATUS_MESSAGES) -> JobResponse:
+    """Build the API view of a job, showing only the fields its status uses"""
+    status = job.status
+    # Job is already-validated internal state, so skip re-validating it
+    return JobResponse.model_construct(
+        job_id=job.id,
+        status=status,
+        message=messages[status].format(step=job.progress.step_description, error=job.error_message),
+        progress=job.progress if status == JobStatus.RUNNING else None,
+        result=job.result if status == JobStatus.COMPLETED else None,
+        error_message=job.error_message if status == JobStatus.FAILED else None,
+        created_at=job.created_at
+    )
+
 
 @router.post("/jobs", response_model=JobResponse, summary="Create a new job")
 async def create_job(job_request: JobRequest) -> JobResponse:
@@ -52,8 +85,8 @@ async def create_job(job_request: JobRequest) -> JobResponse:
             status=job.status,
             message="Job created successfully",
             created_at=job.created_at,
-            estimated_completion=datetime.now().replace(second=0, microsecond=0) + 
-                              timedelta(seconds=job_request.timeout_seconds * 0.8)  # Estimate 80% of timeout
+            # Estimate 80% of the timeout from when the job was created
+            estimated_completion=job.created_at + timedelta(seconds=job_request.timeout_seconds * 0.8)
         )
         
     except Exception as e:
@@ -61,6 +94,24 @@ async def create_job(job_request: JobRequest) -> JobResponse:
         raise HTTPException(status_code=500, detail=f"Failed to create job: {str(e)}")
 
 
+# Declared before /jobs/{job_id}, which would otherwise take "stats" as a job id
+@router.get("/jobs/stats", summary="Get job statistics")
+async def get_job_stats() -> dict:
+    """
+    Get statistics about jobs in the system
+    """
+    job_manager = get_job_manager()
+    
+    stats = job_manager.get_counts()
+    
+    # Browser contexts available to food search jobs (0 until the browser is up)
+    browser_pool = get_browser_pool()
+    stats["browser_pool_size"] = browser_pool.size if browser_pool else 0
+    stats["browser_pool_available"] = browser_pool.available if browser_pool else 0
+    
+    return stats
+
+
 @router.get("/jobs/{job_id}", response_model=JobResponse, summary="Get job status")
 async def get_job_status(job_id: str) -> JobResponse:
     """
@@ -85,32 +136,13 @@ async def get_job_status(job_id: str) -> JobResponse:
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Create response based on job status
-    response_data = {
-        "job_id": job.id,
-        "status": job.status,
-        "created_at": job.created_at
-    }
-    
-    if job.status == JobStatus.PENDING:
-        response_data["message"] = "Job is queued for processing"
-        
-    elif job.status == JobStatus.RUNNING:
-        response_data["message"] = f"Job is running: {job.progress.step_description}"
-        response_data["progress"] = job.progress
-        
-    elif job.status == JobStatus.COMPLETED:
-        response_data["message"] = "Job completed successfully"
-        response_data["result"] = job.result
-        
-    elif job.status == JobStatus.FAILED:
-        response_data["message"] = f"Job failed: {job.error_message}"
-        response_data["error_message"] = job.error_message
-        
-    elif job.status == JobStatus.CANCELLED:
-        response_data["message"] = "Job was cancelled"
+    # Finished jobs never change, so serialize their response only once
+    if job.status in TERMINAL_STATUSES:
+        if job._response_bytes is None:
+            job._response_bytes = _job_response(job).model_dump_json().encode()
+        return Response(content=job._response_bytes, media_type="application/json")
     
-    return JobResponse(**response_data)
+    return _job_response(job)
 
 
 @router.get("/jobs", response_model=JobListResponse, summary="List jobs")
@@ -127,44 +159,18 @@ async def list_jobs(
     - **limit**: Number of jobs per page (1-100)
     - **page**: Page number for pagination
     
-    Returns jobs sorted by creation time (newest first).
+    Returns jobs newest first: by creation time, or with a status filter, by
+    when each job entered that status (a retried job lists as a new pending job).
     """
     job_manager = get_job_manager()
     
     # Calculate offset for pagination
     offset = (page - 1) * limit
     
-    # Get all jobs matching criteria
-    all_jobs = job_manager.list_jobs(status=status, limit=1000)  # Get all matching
-    total_count = len(all_jobs)
-    
-    # Apply pagination
-    jobs_page = all_jobs[offset:offset + limit]
-    
-    # Convert to response format
-    job_responses = []
-    for job in jobs_page:
-        job_response = {
-            "job_id": job.id,
-            "status": job.status,
-            "created_at": job.created_at
-        }
-        
-        if job.status == JobStatus.PENDING:
-            job_response["message"] = "Queued for processing"
-        elif job.status == JobStatus.RUNNING:
-            job_response["message"] = f"Running: {job.progress.step_description}"
-            job_response["progress"] = job.progress
-        elif job.status == JobStatus.COMPLETED:
-            job_response["message"] = "Completed successfully"
-            job_response["result"] = job.result
-        elif job.status == JobStatus.FAILED:
-            job_response["message"] = f"Failed: {job.error_message}"
-            job_response["error_message"] = job.error_message
-        elif job.status == JobStatus.CANCELLED:
-            job_response["message"] = "Cancelled"
-        
-        job_responses.append(JobResponse(**job_response))
+    # Get just the requested page and the total matching
+    jobs_page, total_count = job_manager.list_jobs_paginated(status, offset, limit)
+    
+    job_responses = [_job_response(job, _LIST_STATUS_MESSAGES) for job in jobs_page]
     
     return JobListResponse(
         jobs=job_responses,
@@ -207,30 +213,9 @@ async def create_food_search_job(search_request: SearchRequest) -> JobResponse:
     """
     job_request = JobRequest(
         job_type=JobType.FOOD_SEARCH,
-        job_data=search_request.dict(),
+        job_data=search_request.model_dump(exclude_unset=True),
         priority=5,
         timeout_seconds=300
     )
     
     return await create_job(job_request)
-
-
-@router.get("/jobs/stats", summary="Get job statistics")
-async def get_job_stats() -> dict:
-    """
-    Get statistics about jobs in the system
-    """
-    job_manager = get_job_manager()
-    
-    all_jobs = job_manager.list_jobs(limit=1000)
-    
-    stats = {
-        "total_jobs": len(all_jobs),
-        "pending": len([j for j in all_jobs if j.status == JobStatus.PENDING]),
-        "running": len([j for j in all_jobs if j.status == JobStatus.RUNNING]),
-        "completed": len([j for j in all_jobs if j.status == JobStatus.COMPLETED]),
-        "failed": len([j for j in all_jobs if j.status == JobStatus.FAILED]),
-        "cancelled": len([j for j in all_jobs if j.status == JobStatus.CANCELLED]),
-    }
-    
-    return stats
\ No newline at end of file
@@ -1,41 +1,145 @@
 """
 API routes for food search functionality using Browser Use Rappi agent
 """
+import asyncio
+import bisect
 import logging
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, List, Set, Tuple
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
 
 from app.models import (
     SearchRequest, 
     SearchResponse, 
+    SearchMetadata,
     BrowserStatus, 
     AgentConfig,
     ErrorResponse
 )
-from app.agents.rappi_agent import RappiAgent
+from app.agents.pool import AgentPool
+from app.dependencies import get_agent_pool
 
 logger = logging.getLogger(__name__)
 
 # Create router
 router = APIRouter()
 
-# Global agent instance (in production, you might want to use dependency injection)
-_agent_instance = None
+
+# Encoded responses of recent successful searches; repeats skip the agent entirely.
+# Only touched between awaits on the event loop, so it needs no lock.
+_search_cache: TTLCache = TTLCache(
+    maxsize=1024,
+    ttl=int(os.getenv("SEARCH_CACHE_TTL", "120"))
+)
+
+
+# Searches currently running, so identical concurrent requests share one agent run
+_inflight: Dict[Tuple[str, str, str, str], asyncio.Task] = {}
+
+# How often each distinct search was requested, for background cache warming
+_search_counts: Counter = Counter()
+_search_requests: Dict[Tuple[str, str, str, str], SearchRequest] = {}
+_MAX_TRACKED_SEARCHES = 1024
+
+# Seconds between warm-up rounds (0 disables), and searches refreshed per round
+SEARCH_WARM_INTERVAL = float(os.getenv("SEARCH_WARM_INTERVAL", "0"))
+SEARCH_WARM_TOP_K = int(os.getenv("SEARCH_WARM_TOP_K", "5"))
+
+
+async def _pooled_search(pool: AgentPool, search_request: SearchRequest, refresh: bool = False) -> SearchResponse:
+    """Run a search on whichever pooled agent is free next"""
+    async with pool.agent() as agent:
+        return await agent.search_food_options(search_request, refresh=refresh)
+
+
+def _json_response(model: BaseModel) -> Response:
+    """Serialize a model we built ourselves, skipping response_model re-validation"""
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def _cache_search_result(cache_key: Tuple[str, str, str, str], pool: AgentPool, result: SearchResponse) -> bytes:
+    """Encode a search result, caching it if it is worth repeating"""
+    content = result.model_dump_json().encode()
+    # Only deterministic agents give answers worth repeating, and canned
+    # sample results must not outlive sample mode
+    config = pool.config
+    if result.success and result.results and config.llm_temperature == 0 and not config.sample_mode:
+        _search_cache[cache_key] = content
+    return content
+
+
+def _track_search(cache_key: Tuple[str, str, str, str], search_request: SearchRequest):
+    """Count a search request so popular ones can be warmed in the background"""
+    _search_counts[cache_key] += 1
+    _search_requests[cache_key] = search_request
+    if len(_search_counts) > _MAX_TRACKED_SEARCHES:
+        # Keep the most popular half so tracking stays bounded
+        keep = dict(_search_counts.most_common(_MAX_TRACKED_SEARCHES // 2))
+        _search_counts.clear()
+        _search_counts.update(keep)
+        for key in list(_search_requests):
+            if key not in keep:
+                del _search_requests[key]
+
+
+async def warm_popular_searches(pool: AgentPool):
+    """Re-run the most requested searches so their cache entries stay fresh"""
+    # Each run bypasses the agent's response cache - otherwise it would only
+    # copy a possibly hour-old cached answer into the route cache
+    popular = [key for key, _ in _search_counts.most_common(SEARCH_WARM_TOP_K)]
+    if not popular:
+        return
+    
+    semaphore = asyncio.Semaphore(_WARMUP_CONCURRENCY)
+    
+    async def warm(cache_key: Tuple[str, str, str, str]):
+        async with semaphore:
+            search_request = _search_requests[cache_key]
+            result = await _pooled_search(pool, search_request, refresh=True)
+            # Tracked under the config it was requested with; cache under the current one
+            _cache_search_result(_search_cache_key(search_request, pool.config), pool, result)
+    
+    outcomes = await asyncio.gather(*(warm(key) for key in popular), return_exceptions=True)
+    failures = sum(isinstance(outcome, Exception) for outcome in outcomes)
+    logger.info("Warmed %d popular searches (%d failed)", len(popular), failures)
 
 
-def get_agent_instance(config: AgentConfig = None) -> RappiAgent:
-    """Get or create agent instance"""
-    global _agent_instance
-    if _agent_instance is None:
-        _agent_instance = RappiAgent(config or AgentConfig())
-    return _agent_instance
+async def warm_search_cache_loop(app):
+    """Background loop refreshing popular searches every SEARCH_WARM_INTERVAL seconds"""
+    while True:
+        await asyncio.sleep(SEARCH_WARM_INTERVAL)
+        try:
+            await warm_popular_searches(app.state.agent_pool)
+        except Exception as e:
+            logger.error("Search cache warm-up failed: %s", e)
+
+
+def _search_cache_key(search_request: SearchRequest, config: AgentConfig) -> Tuple[str, str, str, str]:
+    """Agent config, case-insensitive location and query, plus everything else in the request"""
+    # The config is part of the key so a pool swapped in by /agent/config or
+    # /agent/reset never serves or joins searches run under the old settings
+    return (
+        config.model_dump_json(),
+        search_request.location.strip().lower(),
+        (search_request.search_query or "").strip().lower(),
+        search_request.model_dump_json(exclude={"location", "search_query"})
+    )
 
 
 @router.post("/search", response_model=SearchResponse)
 async def search_food_options(
     search_request: SearchRequest,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    pool: AgentPool = Depends(get_agent_pool)
 ) -> SearchResponse:
     """
     Search for food options on Rappi based on user preferences
@@ -44,55 +148,69 @@ async def search_food_options(
     and returns structured data about available restaurants and food options.
     """
     try:
-        logger.info(f"Received search request for location: {search_request.location}")
-        
-        # Validate request
-        if not search_request.location.strip():
-            raise HTTPException(
-                status_code=400, 
-                detail="Location is required"
-            )
+        logger.info("Received search request for location: %s", search_request.location)
         
-        # Get agent instance
-        agent = get_agent_instance()
+        cache_key = _search_cache_key(search_request, pool.config)
+        _track_search(cache_key, search_request)
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving search from the route cache")
+            return Response(content=cached, media_type="application/json")
         
-        # Perform the search
-        result = await agent.search_food_options(search_request)
+        # Perform the search, joining an identical one if it is already running
+        search_task = _inflight.get(cache_key)
+        if search_task is None:
+            search_task = asyncio.create_task(_pooled_search(pool, search_request))
+            _inflight[cache_key] = search_task
+            search_task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+        # shield: one caller going away must not cancel the search for the others
+        result = await asyncio.shield(search_task)
         
-        logger.info(f"Search completed. Success: {result.success}, Results: {len(result.results)}")
+        logger.info("Search completed. Success: %s, Results: %d", result.success, len(result.results))
         
-        return result
+        # Encoded once both for the cache and for this response
+        content = _cache_search_result(cache_key, pool, result)
+        return Response(content=content, media_type="application/json")
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Search endpoint error: {str(e)}")
+        logger.error("Search endpoint error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error during search: {str(e)}"
         )
 
 
+_RAPPI_URL = "https://rappi.com.ar"
+_IDLE_BROWSER_STATUS = BrowserStatus(is_active=False).model_dump()
+
+
 @router.get("/search/status", response_model=BrowserStatus)
-async def get_browser_status() -> BrowserStatus:
+async def get_browser_status(pool: AgentPool = Depends(get_agent_pool)) -> BrowserStatus:
     """
     Get the current status of the browser agent
     """
     try:
-        agent = get_agent_instance()
+        # Report the agent that ran the most recent search
+        agent = pool.last_used
+        if agent is None:
+            # Nothing has run yet - a prebuilt payload, nothing to format
+            return ORJSONResponse(_IDLE_BROWSER_STATUS)
         
         # Check if agent has an active session
         is_active = agent.session_id is not None
+        last_search_time = agent.last_search_time
         
-        return BrowserStatus(
-            is_active=is_active,
-            session_id=agent.session_id,
-            current_url="https://rappi.com.ar" if is_active else None,
-            last_action=f"Last search: {agent.last_search_time}" if agent.last_search_time else None
-        )
+        return ORJSONResponse({
+            "is_active": is_active,
+            "session_id": agent.session_id,
+            "current_url": _RAPPI_URL if is_active else None,
+            "last_action": f"Last search: {last_search_time}" if last_search_time else None
+        })
         
     except Exception as e:
-        logger.error(f"Status endpoint error: {str(e)}")
+        logger.error("Status endpoint error: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Could not retrieve browser status"
@@ -100,7 +218,7 @@ async def get_browser_status() -> BrowserStatus:
 
 
 @router.post("/search/test", response_model=SearchResponse)
-async def test_search() -> SearchResponse:
+async def test_search(pool: AgentPool = Depends(get_agent_pool)) -> SearchResponse:
     """
     Test endpoint with a predefined search to verify the system is working
     """
@@ -112,40 +230,125 @@ async def test_search() -> SearchResponse:
             search_query="pizza"
         )
         
-        agent = get_agent_instance()
-        result = await agent.search_food_options(test_request)
+        result = await _pooled_search(pool, test_request)
         
-        return result
+        return _json_response(result)
         
     except Exception as e:
-        logger.error(f"Test search error: {str(e)}")
+        logger.error("Test search error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Test search failed: {str(e)}"
         )
 
 
+# Canned (location, query, max_results) searches run together by /search/test/batch
+_WARMUP_SEARCHES = (
+    ("Buenos Aires, Argentina", "pizza", 3),
+    ("Palermo, Buenos Aires, Argentina", "sushi", 3),
+    ("Córdoba, Córdoba, Argentina", "empanadas", 3),
+)
+# Searches the batch test runs at once, to stay under browser/provider limits
+_WARMUP_CONCURRENCY = 3
+
+
+@router.post("/search/test/batch", response_model=SearchResponse)
+async def test_search_batch(pool: AgentPool = Depends(get_agent_pool)) -> SearchResponse:
+    """
+    Run several predefined searches concurrently to verify searches overlap
+    
+    Results of all searches are combined into one response; as a warm-up this
+    fills the search caches in parallel.
+    """
+    try:
+        semaphore = asyncio.Semaphore(_WARMUP_CONCURRENCY)
+        
+        async def run_search(location: str, query: str, max_results: int) -> SearchResponse:
+            async with semaphore:
+                return await _pooled_search(
+                    pool, SearchRequest(location=location, search_query=query, max_results=max_results)
+                )
+        
+        start_time = datetime.now()
+        outcomes = await asyncio.gather(
+            *(run_search(*search) for search in _WARMUP_SEARCHES),
+            return_exceptions=True
+        )
+        
+        results = []
+        errors = []
+        for (location, query, _), outcome in zip(_WARMUP_SEARCHES, outcomes):
+            if isinstance(outcome, Exception):
+                errors.append(f"{query} in {location}: {outcome}")
+            elif not outcome.success:
+                errors.append(f"{query} in {location}: {outcome.error_message}")
+            else:
+                results.extend(outcome.results)
+        
+        return _json_response(SearchResponse(
+            success=not errors,
+            results=results,
+            search_metadata=SearchMetadata(
+                location="; ".join(location for location, _, _ in _WARMUP_SEARCHES),
+                total_found=len(results),
+                search_time=str(datetime.now() - start_time),
+                search_timestamp=start_time.isoformat(),
+                browser_session_id="batch"
+            ),
+            error_message="; ".join(errors) or None
+        ))
+        
+    except Exception as e:
+        logger.error("Batch test search error: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch test search failed: {str(e)}"
+        )
+
+
+# Replaced pools still finishing their searches before they close
+_retiring_pools: Set[asyncio.Task] = set()
+
+
+async def _close_agent_pool(pool: AgentPool):
+    """Release a replaced pool's browser sessions instead of leaking them"""
+    try:
+        await pool.aclose()
+    except Exception:
+        logger.exception("Closing the previous agent pool failed")
+
+
+def _retire_agent_pool(pool: AgentPool):
+    """Close a replaced pool in the background once its searches have finished"""
+    # Searches already holding or waiting for one of its agents run to
+    # completion; new ones go to the pool that replaced it
+    task = asyncio.create_task(_close_agent_pool(pool))
+    _retiring_pools.add(task)
+    task.add_done_callback(_retiring_pools.discard)
+
+
 @router.post("/agent/config", response_model=Dict[str, Any])
-async def update_agent_config(config: AgentConfig) -> Dict[str, Any]:
+async def update_agent_config(config: AgentConfig, request: Request) -> Dict[str, Any]:
     """
     Update the agent configuration
     """
     try:
-        global _agent_instance
-        
-        # Create new agent instance with updated config
-        _agent_instance = RappiAgent(config)
+        # Create a new agent pool with the updated config
+        old_pool = request.app.state.agent_pool
+        request.app.state.agent_pool = AgentPool(config=config)
+        _retire_agent_pool(old_pool)
         
-        logger.info(f"Agent configuration updated: {config.dict()}")
+        dumped = config.model_dump()
+        logger.info("Agent configuration updated: %s", dumped)
         
         return {
             "success": True,
             "message": "Agent configuration updated successfully",
-            "config": config.dict()
+            "config": dumped
         }
         
     except Exception as e:
-        logger.error(f"Config update error: {str(e)}")
+        logger.error("Config update error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to update configuration: {str(e)}"
@@ -153,16 +356,15 @@ async def update_agent_config(config: AgentConfig) -> Dict[str, Any]:
 
 
 @router.get("/agent/config", response_model=AgentConfig)
-async def get_agent_config() -> AgentConfig:
+async def get_agent_config(pool: AgentPool = Depends(get_agent_pool)) -> AgentConfig:
     """
     Get the current agent configuration
     """
     try:
-        agent = get_agent_instance()
-        return agent.config
+        return pool.config
         
     except Exception as e:
-        logger.error(f"Get config error: {str(e)}")
+        logger.error("Get config error: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Could not retrieve agent configuration"
@@ -170,13 +372,15 @@ async def get_agent_config() -> AgentConfig:
 
 
 @router.delete("/agent/reset")
-async def reset_agent() -> Dict[str, Any]:
+async def reset_agent(request: Request) -> Dict[str, Any]:
     """
     Reset the agent instance (useful for clearing any stuck sessions)
     """
     try:
-        global _agent_instance
-        _agent_instance = None
+        # Fresh agents with the default configuration
+        old_pool = request.app.state.agent_pool
+        request.app.state.agent_pool = AgentPool(config=AgentConfig())
+        _retire_agent_pool(old_pool)
         
         logger.info("Agent instance reset")
         
@@ -186,42 +390,116 @@ async def reset_agent() -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Agent reset error: {str(e)}")
+        logger.error("Agent reset error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to reset agent: {str(e)}"
         )
 
 
-@router.get("/locations/suggestions")
-async def get_location_suggestions(query: str = "") -> Dict[str, Any]:
+@router.get("/locations/suggestions", response_class=ORJSONResponse)
+async def get_location_suggestions(query: str = "") -> Response:
     """
     Get location suggestions for Argentina (static suggestions for now)
     """
-    # In a real implementation, you might integrate with a geocoding service
-    argentina_locations = [
-        "Buenos Aires, Capital Federal, Argentina",
-        "Córdoba, Córdoba, Argentina", 
-        "Rosario, Santa Fe, Argentina",
-        "Mendoza, Mendoza, Argentina",
-        "La Plata, Buenos Aires, Argentina",
-        "Tucumán, Tucumán, Argentina",
-        "Mar del Plata, Buenos Aires, Argentina",
-        "Palermo, Buenos Aires, Argentina",
-        "Recoleta, Buenos Aires, Argentina",
-        "Belgrano, Buenos Aires, Argentina"
-    ]
-    
-    # Filter based on query if provided
-    if query:
-        filtered_locations = [
-            loc for loc in argentina_locations 
-            if query.lower() in loc.lower()
-        ]
+    # Runs on the event loop, so keep it cheap: a repeated query is one
+    # lru_cache hit returning already-encoded bytes, with nothing built
+    query = query.lower().strip()
+    # Responses are pre-encoded JSON, so there is nothing left to serialize
+    content = _suggest_locations(query) if query else _ALL_SUGGESTIONS_BYTES
+    return Response(content=content, media_type="application/json")
+
+
+# In a real implementation, you might integrate with a geocoding service.
+# Interned and kept in tuples, built once at import (shared by preloaded workers).
+_ARGENTINA_LOCATIONS = tuple(sys.intern(location) for location in (
+    "Buenos Aires, Capital Federal, Argentina",
+    "Córdoba, Córdoba, Argentina",
+    "Rosario, Santa Fe, Argentina",
+    "Mendoza, Mendoza, Argentina",
+    "La Plata, Buenos Aires, Argentina",
+    "Tucumán, Tucumán, Argentina",
+    "Mar del Plata, Buenos Aires, Argentina",
+    "Palermo, Buenos Aires, Argentina",
+    "Recoleta, Buenos Aires, Argentina",
+    "Belgrano, Buenos Aires, Argentina"
+))
+# Lowercased once at import for case-insensitive matching
+_ARGENTINA_LOCATIONS_LOWER = tuple(sys.intern(location.lower()) for location in _ARGENTINA_LOCATIONS)
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into its words"""
+    return re.findall(r"\w+", text)
+
+
+# Whole words of each location, for ranking matches
+_LOCATION_TOKENS = tuple(frozenset(_tokenize(location)) for location in _ARGENTINA_LOCATIONS_LOWER)
+
+
+def _build_trigram_index() -> Dict[str, Set[int]]:
+    """Map each 3-gram to the indices of the locations containing it"""
+    index: Dict[str, Set[int]] = defaultdict(set)
+    for position, location in enumerate(_ARGENTINA_LOCATIONS_LOWER):
+        for start in range(len(location) - 2):
+            index[location[start:start + 3]].add(position)
+    return dict(index)
+
+
+# A substring query can only match locations containing all of its 3-grams
+_TRIGRAM_INDEX = _build_trigram_index()
+
+# Lowercased locations in sorted order, so the ones starting with a query
+# form one contiguous run found by bisection
+_SORTED_LOCATIONS = tuple(sorted(
+    (location, position) for position, location in enumerate(_ARGENTINA_LOCATIONS_LOWER)
+))
+_SORTED_LOCATION_KEYS = tuple(location for location, _ in _SORTED_LOCATIONS)
+
+
+def _prefix_matches(query: str) -> Set[int]:
+    """Indices of the locations that start with the query"""
+    start = bisect.bisect_left(_SORTED_LOCATION_KEYS, query)
+    matches = set()
+    for location, position in _SORTED_LOCATIONS[start:]:
+        if not location.startswith(query):
+            break
+        matches.add(position)
+    return matches
+
+
+def _encode_suggestions(locations: List[str]) -> bytes:
+    return orjson.dumps({
+        "suggestions": locations[:10],
+        "total": len(locations)
+    })
+
+
+_ALL_SUGGESTIONS_BYTES = _encode_suggestions(list(_ARGENTINA_LOCATIONS))
+
+
+@lru_cache(maxsize=256)
+def _suggest_locations(query: str) -> bytes:
+    """Encoded suggestions for a normalized (lowercased, stripped) query"""
+    # The location list never changes, so results can be cached forever
+    if len(query) >= 3:
+        candidates = set.intersection(*[
+            _TRIGRAM_INDEX.get(query[start:start + 3], set())
+            for start in range(len(query) - 2)
+        ])
     else:
-        filtered_locations = argentina_locations
+        candidates = range(len(_ARGENTINA_LOCATIONS))
+    
+    # Shared 3-grams don't guarantee a substring match, so confirm each candidate
+    matches = [index for index in sorted(candidates) if query in _ARGENTINA_LOCATIONS_LOWER[index]]
+    
+    # Autocomplete queries are mostly prefixes, so locations starting with the
+    # query come first, then those matching more of its whole words, then list order
+    prefix_hits = _prefix_matches(query)
+    query_tokens = frozenset(_tokenize(query))
+    matches.sort(key=lambda index: (
+        index not in prefix_hits,
+        -len(query_tokens & _LOCATION_TOKENS[index])
+    ))
     
-    return {
-        "suggestions": filtered_locations[:10],
-        "total": len(filtered_locations)
-    }
\ No newline at end of file
+    return _encode_suggestions([_ARGENTINA_LOCATIONS[index] for index in matches])
@@ -0,0 +1,11 @@
+"""
+Gunicorn worker class for the API
+"""
+from uvicorn.workers import UvicornWorker
+
+
+class PinnedUvicornWorker(UvicornWorker):
+    """UvicornWorker pinned to uvloop and httptools"""
+    # uvicorn's "auto" silently falls back to asyncio/h11 when either is
+    # missing; pinning makes a broken install fail at startup instead
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "loop": "uvloop", "http": "httptools"}
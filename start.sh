@@ -16,39 +16,15 @@ playwright --version
 echo "📋 Listing installed browsers..."
 ls -la "$PLAYWRIGHT_BROWSERS_PATH" || echo "Using default browser path"
 
-# Quick browser test
-echo "🧪 Testing browser launch..."
-python3 -c "
-import os
-import sys
-from playwright.sync_api import sync_playwright
-
-try:
-    with sync_playwright() as p:
-        print('Attempting to launch chromium...')
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                '--no-sandbox',
-                '--disable-setuid-sandbox', 
-                '--disable-dev-shm-usage',
-                '--disable-gpu'
-            ]
-        )
-        print('✅ Browser launch test successful')
-        browser.close()
-        print('✅ Browser closed successfully')
-except Exception as e:
-    print(f'❌ Browser launch test failed: {e}')
-    print(f'Error type: {type(e).__name__}')
-    import traceback
-    traceback.print_exc()
-    # In Docker, log the error but don't exit - let the app start for debugging
-    print('⚠️  Continuing with application startup for debugging...')
-"
-
-echo "✅ Browser verification completed"
+# The app launches the browser itself in the background after startup;
+# watch /health for status "starting" -> "healthy"
 
 # Start the FastAPI application
+# Agents and browsers are per process; jobs and caches live in process memory
+# too, so keep WEB_CONCURRENCY=1 unless /jobs polling is pinned to one worker
 echo "🌐 Starting FastAPI server..."
-exec uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
\ No newline at end of file
+exec gunicorn app.main:app \
+    -k app.workers.PinnedUvicornWorker \
+    -w "${WEB_CONCURRENCY:-1}" \
+    --bind "0.0.0.0:${PORT:-8000}" \
+    --preload
\ No newline at end of file